@@ -0,0 +1,181 @@
+""" Heuristic evaluation of Stonehenge states
+
+=== CSC148 Winter 2018 ===
+University of Toronto
+Assignment 2
+Submitted by: Eric Koehli
+
+=== Module Description ===
+This module contains an Evaluator, which scores a Stonehenge state that
+isn't over by a weighted sum of features of the position. Unlike
+rough_outcome, which can only return WIN, LOSE or DRAW, the score is
+graded, so a depth-limited search can tell a good position from a
+slightly worse one.
+
+The weights can be loaded from a config file with a [weights] section:
+
+    [weights]
+    claimed = 1.0
+    threats = 0.5
+    contested = 0.25
+    parity = 0.1
+
+Any weight that isn't in the file keeps its value from DEFAULT_WEIGHTS.
+evaluated_strategy plays with the weights in DEFAULT_WEIGHTS_FILE, if it
+exists.
+"""
+import configparser
+import os
+from typing import Any, Dict, Union
+from stonehenge import StonehengeGame, StonehengeGameState
+from stonehenge_layout import get_ley_line_index
+from subtract_square_game import SubtractSquareGame
+from search_stats import SearchStats
+from shared_transposition import SharedTranspositionTable
+from strategy import timed_strategy
+
+# The weight of each feature; see Evaluator.features.
+DEFAULT_WEIGHTS = {'claimed': 1.0, 'threats': 0.5, 'contested': 0.25,
+                   'parity': 0.1}
+
+# The weights file evaluated_strategy looks for.
+DEFAULT_WEIGHTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                    'weights.ini')
+
+
+def load_weights(path: str) -> Dict[str, float]:
+    """Return the weights in the [weights] section of the config file at
+    <path>, with DEFAULT_WEIGHTS for the ones it leaves out.
+
+    Raise a ValueError if the file names a feature that doesn't exist.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'weights.ini')
+    >>> with open(path, 'w') as config_file:
+    ...     _ = config_file.write('[weights]\\nthreats = 2\\n')
+    >>> load_weights(path)['threats'], load_weights(path)['claimed']
+    (2.0, 1.0)
+    """
+    parser = configparser.ConfigParser()
+    with open(path) as config_file:
+        parser.read_file(config_file)
+    weights = dict(DEFAULT_WEIGHTS)
+    if parser.has_section('weights'):
+        for name, value in parser.items('weights'):
+            if name not in DEFAULT_WEIGHTS:
+                raise ValueError('unknown feature: {}'.format(name))
+            weights[name] = float(value)
+    return weights
+
+
+class Evaluator:
+    """
+    Scores Stonehenge states for their current player.
+
+    === Public Attributes ===
+    weights:
+         The weight of each feature.
+    """
+    weights: Dict[str, float]
+
+    def __init__(self, weights: Dict[str, float] = None) -> None:
+        """Initialize an Evaluator that uses <weights>, or DEFAULT_WEIGHTS
+        if none are given.
+        """
+        self.weights = dict(DEFAULT_WEIGHTS if weights is None else weights)
+
+    def features(self, state: StonehengeGameState) -> Dict[str, int]:
+        """Return the features of <state>, each counted in favour of its
+        current player:
+            - claimed: ley-lines claimed, minus the opponent's.
+            - threats: unclaimed ley-lines that one more cell would claim,
+              minus the opponent's.
+            - contested: over the unclaimed ley-lines, cells captured minus
+              the opponent's.
+            - parity: 1 if the current player gets the last move when every
+              cell is taken, and -1 otherwise.
+
+        >>> state = StonehengeGameState(True, 2).make_move('D')
+        >>> Evaluator().features(state)
+        {'claimed': 0, 'threats': -3, 'contested': -3, 'parity': -1}
+        """
+        player = state.get_current_player_name()
+        opponent = 'p2' if player == 'p1' else 'p1'
+        thresholds = get_ley_line_index(state.board_length).thresholds
+        claimed, threats, contested = 0, 0, 0
+        for ley_line, cells in state.ley_lines.items():
+            if cells[0] == player:
+                claimed += 1
+            elif cells[0] == opponent:
+                claimed -= 1
+            else:
+                mine, theirs = cells.count(player[1]), cells.count(opponent[1])
+                threshold = thresholds[ley_line]
+                threats += ((mine + 1 >= threshold) -
+                            (theirs + 1 >= threshold))
+                contested += mine - theirs
+        parity = 1 if len(state.free_cells) % 2 == 1 else -1
+        return {'claimed': claimed, 'threats': threats,
+                'contested': contested, 'parity': parity}
+
+    def evaluate(self, state: Any) -> float:
+        """Return the score of <state> for its current player, strictly
+        between LOSE and WIN unless the game is over.
+
+        States that aren't Stonehenge states are scored by their
+        rough_outcome.
+
+        >>> evaluator = Evaluator()
+        >>> state = StonehengeGameState(True, 2)
+        >>> evaluator.evaluate(state.make_move('A')) < \
+evaluator.evaluate(state.make_move('D'))
+        True
+        >>> evaluator.evaluate(StonehengeGameState(True, 1).make_move('A'))
+        -1
+        """
+        if not isinstance(state, StonehengeGameState):
+            return state.rough_outcome()
+        player = state.get_current_player_name()
+        opponent = 'p2' if player == 'p1' else 'p1'
+        if 2 * state.claims[opponent] >= len(state.ley_lines):
+            return state.LOSE
+        features = self.features(state)
+        total = sum(self.weights[name] * features[name] for name in features)
+        # Squash the total so only a finished game scores WIN or LOSE.
+        return total / (1 + abs(total))
+
+
+def evaluated_strategy(game: Union[StonehengeGame, SubtractSquareGame],
+                       budget_ms: int = 1000, weights_file: str = None,
+                       stats: SearchStats = None,
+                       table: SharedTranspositionTable = None) -> Union[str,
+                                                                        int]:
+    """
+    Return a move for <game> from timed_strategy, with the states at the
+    depth limit scored by an Evaluator.
+
+    The weights are loaded from <weights_file> if it is given, and
+    otherwise from DEFAULT_WEIGHTS_FILE if it exists; DEFAULT_WEIGHTS are
+    used if neither is there. If <stats> is given, the search is counted
+    in it, and if <table> is given, the search is stored in it (see
+    timed_strategy).
+
+    >>> sh = StonehengeGame(True, 2)
+    >>> gs = StonehengeGameState(board_length=2)
+    >>> sh.current_state = gs.make_move('A').make_move('F').make_move('D')
+    >>> evaluated_strategy(sh)
+    'E'
+    """
+    if weights_file is None and os.path.exists(DEFAULT_WEIGHTS_FILE):
+        weights_file = DEFAULT_WEIGHTS_FILE
+    weights = None if weights_file is None else load_weights(weights_file)
+    return timed_strategy(game, budget_ms,
+                          evaluator=Evaluator(weights).evaluate, stats=stats,
+                          table=table)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -8,10 +8,18 @@ strategy cannot be used on Chopsticks unless you account for infinite loops.
 (You do not have to worry about this for the assignment: only do it for
 your own curiousity!)
 """
+import json
+import sys
 from strategy import *
-from typing import Any, Callable
+from typing import Any, Callable, TextIO
 from subtract_square_game import SubtractSquareGame
 from stonehenge import StonehengeGame
+from opening_book import book_strategy
+from tablebase import tablebase_strategy
+from proof_number import proof_number_strategy
+from search_stats import SearchStats
+from evaluation import evaluated_strategy
+from pondering import pondering_strategy, stop_pondering
 
 # 'h' should map to Stonehenge.
 playable_games = {'s': SubtractSquareGame,
@@ -19,10 +27,29 @@ playable_games = {'s': SubtractSquareGame,
 
 # 'mr' should map to your recursive implementation of minimax while
 # 'mi' should map to your iterative implementation of minimax
+# 'ab' maps to minimax with alpha-beta pruning
+# 't' maps to iterative deepening with a time budget for each move
+# 'te' maps to iterative deepening that scores the states at the depth limit
+# with the weights in weights.ini
+# 'mp' maps to minimax solved in parallel over a process pool
+# 'b' maps to moves from an opening book, then iterative deepening
+# 'tb' maps to moves from a solved tablebase, then iterative deepening
+# 'mc' maps to Monte Carlo tree search
+# 'pn' maps to proven wins from proof-number search, then iterative deepening
+# 'po' maps to alpha-beta that keeps searching during the opponent's turn
 usable_strategies = {'i': interactive_strategy,
                      'ro': rough_outcome_strategy,
                      'mr': recursive_minimax_strategy,
-                     'mi': iterative_minimax_strategy}
+                     'mi': iterative_minimax_strategy,
+                     'ab': alphabeta_strategy,
+                     't': timed_strategy,
+                     'te': evaluated_strategy,
+                     'mp': parallel_minimax_strategy,
+                     'b': book_strategy,
+                     'tb': tablebase_strategy,
+                     'mc': mcts_strategy,
+                     'pn': proof_number_strategy,
+                     'po': pondering_strategy}
 
 
 class GameInterface:
@@ -54,10 +81,20 @@ class GameInterface:
         self.p1_strategy = p1_strategy
         self.p2_strategy = p2_strategy
 
-    def play(self) -> None:
+    def play(self, stats: str = None, stats_file: TextIO = None) -> None:
         """
         Play the game.
+
+        If <stats> is 'text', a summary of the search behind each move is
+        printed after the move, and if it is 'json', the same numbers are
+        written as one line of JSON per move (see search_stats). They go to
+        <stats_file> if it is given, and to standard output otherwise.
         """
+        if stats not in (None, 'text', 'json'):
+            raise ValueError('unknown stats format: {}'.format(stats))
+        if stats_file is None:
+            stats_file = sys.stdout
+        turn = 0
         current_state = self.game.current_state
 
         print(self.game.get_instructions())
@@ -74,11 +111,16 @@ class GameInterface:
                 print(move)
 
             # Pick a (legal) move.
+            move_stats = None if stats is None else SearchStats()
             while not current_state.is_valid_move(move_to_make):
                 current_strategy = self.p2_strategy
                 if current_state.get_current_player_name() == 'p1':
                     current_strategy = self.p1_strategy
-                move_to_make = current_strategy(self.game)
+                if move_stats is None:
+                    move_to_make = current_strategy(self.game)
+                else:
+                    move_to_make = current_strategy(self.game,
+                                                    stats=move_stats)
 
             # Apply the move
             current_player_name = current_state.get_current_player_name()
@@ -90,6 +132,21 @@ class GameInterface:
                 current_player_name, move_to_make))
             print(current_state)
 
+            turn += 1
+            if stats == 'text':
+                print("Search for move {} by {} ({}): {}".format(
+                    turn, current_player_name, current_strategy.__name__,
+                    move_stats), file=stats_file)
+            elif stats == 'json':
+                record = {'turn': turn, 'player': current_player_name,
+                          'strategy': current_strategy.__name__,
+                          'move': move_to_make}
+                record.update(move_stats.as_dict())
+                print(json.dumps(record), file=stats_file)
+
+        # Stop any strategy still searching the opponent's replies.
+        stop_pondering(self.game)
+
         # Print out the winner of the game
         if self.game.is_winner("p1"):
             print("Player 1 is the winner!")
@@ -124,5 +181,12 @@ if __name__ == '__main__':
     while p2 not in usable_strategies.keys():
         p2 = input("Select the strategy for Player 2 ({}): ".format(strategies))
 
+    stats_formats = {'': None, 't': 'text', 'j': 'json'}
+    stats_format = None
+    while stats_format not in stats_formats.keys():
+        stats_format = input("Type t to print the search statistics of "
+                             "each move, j to print them as JSON lines, "
+                             "or nothing for neither: ")
+
     GameInterface(playable_games[chosen_game], usable_strategies[p1],
-                  usable_strategies[p2]).play()
+                  usable_strategies[p2]).play(stats_formats[stats_format])
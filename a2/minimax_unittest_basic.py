@@ -21,11 +21,23 @@ strategy with Chopsticks either, unless you handle repeated/looping states.
 import unittest
 from unittest.mock import patch
 import inspect
+import os
+import tempfile
 
 # Import the student solution
 from game_interface import playable_games, usable_strategies
+from search_stats import SearchStats
+from shared_transposition import SharedTranspositionTable
+from persistent_cache import PersistentCache
+from pondering import stop_pondering
+from strategy import alphabeta_solve
 minimax_iterative_strategy = usable_strategies['mi']
 minimax_recursive_strategy = usable_strategies['mr']
+alphabeta_strategy = usable_strategies['ab']
+mcts_strategy = usable_strategies['mc']
+proof_number_strategy = usable_strategies['pn']
+pondering_strategy = usable_strategies['po']
+timed_strategy = usable_strategies['t']
 StonehengeGame = playable_games['h']
 SubtractSquareGame = playable_games['s']
 
@@ -232,5 +244,204 @@ class MinimaxUnitTests(unittest.TestCase):
                              expected_move, move_chosen, str(new_state)
                          ))
 
+    def test_recursive_stonehenge_shared_table(self):
+        """
+        Test that recursive minimax and alpha-beta find the only winning move
+        when they store their scores in a SharedTranspositionTable.
+        """
+        with patch('builtins.input', return_value='2'):
+            game = StonehengeGame(True)
+        for move in ['A', 'F', 'D']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        with SharedTranspositionTable(1024) as table:
+            moves_chosen = [minimax_recursive_strategy(game, table),
+                            alphabeta_strategy(game, table=table)]
+            self.assertGreater(table.hits, 0)
+        self.assertEqual(moves_chosen, ['E', 'E'],
+                         ("Calling minimax with a shared table on a game " +
+                          "of Stonehenge should return the move E but got " +
+                          "{} instead.\n{}").format(
+                             moves_chosen, str(game.current_state)
+                         ))
+
+    def test_timed_stonehenge_shared_table(self):
+        """
+        Test that the timed search can store its search in a
+        SharedTranspositionTable, and that alpha-beta still finds the right
+        score with the same table afterwards.
+        """
+        with patch('builtins.input', return_value='3'):
+            game = StonehengeGame(True)
+        for move in ['A', 'K']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+        score = alphabeta_solve(game, game.current_state)[1]
+
+        with SharedTranspositionTable(1 << 14) as table:
+            move_chosen = timed_strategy(game, 200, table=table)
+            self.assertIn(move_chosen,
+                          game.current_state.get_possible_moves())
+            self.assertGreater(len(table), 0)
+            self.assertEqual(alphabeta_solve(game, game.current_state,
+                                             table=table)[1], score)
+
+    def test_recursive_stonehenge_persistent_cache(self):
+        """
+        Test that recursive minimax finds the only winning move again from
+        a PersistentCache that was closed and opened again, without
+        searching any state that isn't in the cache.
+        """
+        with patch('builtins.input', return_value='2'):
+            game = StonehengeGame(True)
+        for move in ['A', 'F', 'D']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        path = os.path.join(tempfile.mkdtemp(), 'cache')
+        with PersistentCache(path) as cache:
+            first_move = minimax_recursive_strategy(game, cache)
+        with PersistentCache(path) as cache:
+            second_move = minimax_recursive_strategy(game, cache)
+            self.assertEqual(cache.misses, 0)
+        self.assertEqual([first_move, second_move], ['E', 'E'],
+                         ("Calling recursive minimax with a persistent " +
+                          "cache on a game of Stonehenge should return the " +
+                          "move E but got {} instead.\n{}").format(
+                             [first_move, second_move],
+                             str(game.current_state)
+                         ))
+
+    def test_alphabeta_subtract_square_18(self):
+        """
+        Test alpha-beta on a game of SubtractSquare with a value of 18.
+
+        The chosen move should be 16 or 1, as picking 4 or 9 will result in a
+        loss.
+        """
+        with patch('builtins.input', return_value='18'):
+            game = SubtractSquareGame(True)
+
+        move_chosen = alphabeta_strategy(game)
+        expected_moves = [game.str_to_move("1"), game.str_to_move("16")]
+
+        self.assertTrue(move_chosen in expected_moves,
+                        ("Calling alpha-beta on a game of SubtractSquare " +
+                         "with a value of {} should result in a move in {} " +
+                         "being returned, but {} was returned instead.").format(
+                            18, expected_moves, move_chosen
+                        ))
+
+    def test_alphabeta_matches_minimax_stonehenge(self):
+        """
+        Test that alpha-beta picks the same move as recursive minimax on the
+        Stonehenge boards used above.
+        """
+        boards = [('3', False, ['K', 'A', 'C', 'B', 'F', 'E', 'G', 'D', 'I']),
+                  ('2', True, ['A', 'F', 'D'])]
+        for size, p1_starts, moves_to_make in boards:
+            with patch('builtins.input', return_value=size):
+                game = StonehengeGame(p1_starts)
+            for move in moves_to_make:
+                game.current_state = game.current_state.make_move(
+                    game.str_to_move(move))
+
+            expected_move = minimax_recursive_strategy(game)
+            move_chosen = alphabeta_strategy(game)
+            self.assertEqual(move_chosen, expected_move,
+                             ("Calling alpha-beta on a game of Stonehenge " +
+                              "should return the move {} but got {} " +
+                              "instead.\n{}").format(
+                                 expected_move, move_chosen,
+                                 str(game.current_state)
+                             ))
+
+    def test_mcts_stonehenge_winning_move(self):
+        """
+        Test that MCTS finds the only winning move on a small Stonehenge
+        board, and still finds it when its tree is reused.
+        """
+        with patch('builtins.input', return_value='2'):
+            game = StonehengeGame(True)
+        for move in ['D', 'F', 'A']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        moves_chosen = [mcts_strategy(game, 300, seed=0)
+                        for _ in range(2)]
+        self.assertEqual(moves_chosen, ['E', 'E'],
+                         ("Calling MCTS on a game of Stonehenge should " +
+                          "return the move E but got {} instead.\n{}").format(
+                             moves_chosen, str(game.current_state)
+                         ))
+
+    def test_proof_number_stonehenge_winning_move(self):
+        """
+        Test that proof-number search proves the only winning move on a
+        small Stonehenge board.
+        """
+        with patch('builtins.input', return_value='2'):
+            game = StonehengeGame(True)
+        for move in ['D', 'F', 'A']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        fallback_calls = []
+        move_chosen = proof_number_strategy(
+            game, fallback=lambda game: fallback_calls.append(game))
+        self.assertEqual(move_chosen, 'E',
+                         ("Calling proof-number search on a game of " +
+                          "Stonehenge should return the move E but got {} " +
+                          "instead.\n{}").format(
+                             move_chosen, str(game.current_state)
+                         ))
+        self.assertEqual(fallback_calls, [])
+
+    def test_pondering_stonehenge_winning_move(self):
+        """
+        Test that pondering alpha-beta finds the only winning move, and
+        stops pondering when asked to.
+        """
+        with patch('builtins.input', return_value='2'):
+            game = StonehengeGame(True)
+        for move in ['D', 'F', 'A']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        move_chosen = pondering_strategy(game)
+        stop_pondering(game)
+        self.assertEqual(move_chosen, 'E',
+                         ("Calling pondering alpha-beta on a game of " +
+                          "Stonehenge should return the move E but got {} " +
+                          "instead.\n{}").format(
+                             move_chosen, str(game.current_state)
+                         ))
+
+    def test_strategies_fill_in_stats(self):
+        """
+        Test that every strategy that searches counts its search in the
+        SearchStats it is given.
+        """
+        with patch('builtins.input', return_value='2'):
+            game = StonehengeGame(True)
+        for move in ['D', 'F', 'A']:
+            game.current_state = game.current_state.make_move(
+                game.str_to_move(move))
+
+        try:
+            for key, strategy in usable_strategies.items():
+                if key in ('i', 'mp'):
+                    continue
+                stats = SearchStats()
+                strategy(game, stats=stats)
+                self.assertGreater(stats.nodes + stats.evaluated_nodes, 0,
+                                   "Strategy {} didn't count its "
+                                   "search".format(key))
+                self.assertGreater(stats.elapsed, 0)
+        finally:
+            stop_pondering(game)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,116 @@
+""" Move ordering for game tree searches
+
+=== CSC148 Winter 2018 ===
+University of Toronto,
+Computer Science
+Assignment 2
+__author__ = 'Eric Koehli'
+
+=== Module Description ===
+This module contains a MoveOrderer, which sorts the moves of a game state
+so that the moves most likely to be good are searched first. Pruning
+searches like alpha-beta skip more of the game tree the sooner they find
+a good move.
+
+Moves are ordered by:
+    1. (Stonehenge only) how many ley-lines the move claims right away,
+    2. (Stonehenge only) how many contested ley-lines the move sits on,
+    3. whether the move is a killer move at this ply, i.e. it caused a
+       cutoff in a sibling position,
+    4. its history score, i.e. how often and how deep it caused cutoffs
+       anywhere in the search.
+"""
+from typing import Any, Dict, List, Tuple, Union
+from stonehenge import StonehengeGameState
+from stonehenge_bitboard import StonehengeBitboardState
+from subtract_square_state import SubtractSquareState
+
+
+class MoveOrderer:
+    """Orders moves for a search using static Stonehenge heuristics and
+    killer and history tables learned during the search.
+
+    The same MoveOrderer should be used for a whole search (or several
+    searches of the same game), so what it learns carries over.
+
+    === Public Attributes ===
+    num_killers:
+         The number of killer moves remembered for each ply.
+    killers:
+         Maps a ply (the number of moves made since the root) to the most
+         recent moves that caused a cutoff there, newest first.
+    history:
+         Maps a move to the total weight of the cutoffs it caused.
+    """
+    num_killers: int
+    killers: Dict[int, List[Any]]
+    history: Dict[Any, int]
+
+    def __init__(self, num_killers: int = 2) -> None:
+        """Initialize a new MoveOrderer that hasn't learned anything yet.
+        """
+        self.num_killers = num_killers
+        self.killers, self.history = {}, {}
+
+    def order(self, state: Union[StonehengeGameState, StonehengeBitboardState,
+                                 SubtractSquareState],
+              moves: List[Any], ply: int = 0) -> List[Any]:
+        """Return <moves> from <state> sorted from the most to the least
+        promising. <ply> is the number of moves made since the root of the
+        search.
+
+        >>> orderer = MoveOrderer()
+        >>> state = StonehengeGameState(True, 2).make_move('B')
+        >>> state = state.make_move('C')
+        >>> orderer.order(state, state.get_possible_moves())
+        ['F', 'G', 'D', 'E', 'A']
+        >>> state = SubtractSquareState(True, 10)
+        >>> orderer.order(state, state.get_possible_moves())
+        [1, 4, 9]
+        >>> orderer.record_cutoff(9, 0, 1)
+        >>> orderer.order(state, state.get_possible_moves())
+        [9, 1, 4]
+        """
+        return sorted(moves, key=lambda move: self._sort_key(state, move,
+                                                             ply))
+
+    def _sort_key(self, state: Union[StonehengeGameState,
+                                     StonehengeBitboardState,
+                                     SubtractSquareState],
+                  move: Any, ply: int) -> Tuple[int, int, int, int]:
+        """Return the key that <move> is sorted by in order. Smaller keys
+        are searched first, so every score is negated.
+        """
+        captures, contested = 0, 0
+        if isinstance(state, (StonehengeGameState, StonehengeBitboardState)):
+            captures = state.count_captures(move)
+            contested = state.count_contested(move)
+        is_killer = move in self.killers.get(ply, [])
+        return (-captures, -contested, -int(is_killer),
+                -self.history.get(move, 0))
+
+    def record_cutoff(self, move: Any, ply: int, depth: int) -> None:
+        """Record that <move> caused a cutoff at <ply>, with <depth> moves
+        left to search below it. Deeper cutoffs save more work, so they
+        are weighted more heavily.
+
+        >>> orderer = MoveOrderer(num_killers=2)
+        >>> for move in ['A', 'B', 'C']:
+        ...     orderer.record_cutoff(move, 3, 2)
+        >>> orderer.killers[3]
+        ['C', 'B']
+        >>> orderer.history['A']
+        4
+        """
+        killers = self.killers.setdefault(ply, [])
+        if move not in killers:
+            killers.insert(0, move)
+            del killers[self.num_killers:]
+        self.history[move] = self.history.get(move, 0) + depth * depth
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,301 @@
+""" Stonehenge opening book
+
+=== CSC148 Winter 2018 ===
+University of Toronto
+Assignment 2
+Submitted by: Eric Koehli
+
+=== Module Description ===
+This module builds and reads opening books for Stonehenge. An opening
+book holds the solved best move and score of every position within the
+first few moves of a game, so strategies don't have to solve the same
+openings again in every game.
+
+A book is built offline, one board size at a time:
+
+    python opening_book.py --size 3 --plies 4 --output opening_book_3.bin
+
+The file is a sorted array of fixed-size records, one for every canonical
+state (see stonehenge_symmetry) that was solved:
+    - the canonical key of the state (unsigned 64-bit),
+    - the index of the best move among the cells of the canonical state,
+      in order of their ids (unsigned 8-bit),
+    - the score of the state for its current player (signed 8-bit).
+An OpeningBook memory-maps the file and finds a state by binary search, so
+opening a book costs almost nothing, however big it is.
+"""
+import argparse
+import mmap
+import os
+import struct
+import time
+from typing import Any, Dict, List, Optional, Tuple, Union
+from stonehenge import StonehengeGame, StonehengeGameState
+from stonehenge_layout import get_cells
+from stonehenge_symmetry import canonical_key, canonicalize
+from subtract_square_game import SubtractSquareGame
+from move_ordering import MoveOrderer
+from strategy import alphabeta_solve, timed_strategy
+from search_stats import SearchStats
+
+# The layout of one record: key, move index, score.
+RECORD = struct.Struct('<QBb')
+
+# The name of the book book_strategy looks for, for each board size.
+DEFAULT_BOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            'opening_book_{}.bin')
+
+
+def build_book(board_length: int,
+               plies: int) -> Dict[int, Tuple[int, int]]:
+    """Return the solved records for every canonical Stonehenge state on a
+    board with side length <board_length> that can be reached in fewer
+    than <plies> moves, whichever player starts.
+
+    Each canonical key maps to the index of the best move and the score.
+
+    >>> records = build_book(1, 1)
+    >>> len(records)
+    2
+    >>> sorted(set(records.values()))
+    [(0, 1)]
+    """
+    game = StonehengeGame(True, board_length)
+    orderer = MoveOrderer()
+    cells = get_cells(board_length)
+    records = {}
+    level = {}
+    for p1_starts in [True, False]:
+        state = StonehengeGameState(p1_starts, board_length)
+        level[canonical_key(state)] = canonicalize(state)[0]
+
+    for _ in range(plies):
+        next_level = {}
+        for key, state in level.items():
+            if key in records or game.is_over(state):
+                continue
+            move, score = alphabeta_solve(game, state, orderer)
+            records[key] = (cells.index(move), score)
+            for next_move in state.get_possible_moves():
+                new_state = canonicalize(state.make_move(next_move))[0]
+                next_level[new_state.zobrist] = new_state
+        level = next_level
+    return records
+
+
+def write_book(records: Dict[int, Tuple[int, int]], path: str) -> None:
+    """Write <records> from build_book to a book file at <path>, sorted by
+    key.
+    """
+    with open(path, 'wb') as book_file:
+        for key in sorted(records):
+            move_index, score = records[key]
+            book_file.write(RECORD.pack(key, move_index, score))
+
+
+class OpeningBook:
+    """
+    A read-only opening book file, memory-mapped for lookups.
+
+    === Public Attributes ===
+    path:
+         The path of the book file.
+    num_records:
+         The number of records in the book.
+    """
+    path: str
+    num_records: int
+    # === Private Attributes ===
+    # _file:
+    #     The open book file.
+    # _map:
+    #     The memory map of the book file, or None if the book is empty
+    #     (an empty file can't be mapped).
+    _file: Any
+    _map: Optional[mmap.mmap]
+
+    def __init__(self, path: str) -> None:
+        """Open the book file at <path>.
+
+        Raise a ValueError if the file isn't a whole number of records.
+        """
+        self.path = path
+        self._file = open(path, 'rb')
+        size = os.fstat(self._file.fileno()).st_size
+        if size % RECORD.size != 0:
+            self._file.close()
+            raise ValueError('{} is not an opening book'.format(path))
+        self.num_records = size // RECORD.size
+        self._map = None
+        if size > 0:
+            self._map = mmap.mmap(self._file.fileno(), 0,
+                                  access=mmap.ACCESS_READ)
+
+    def __len__(self) -> int:
+        """Return the number of records in this book.
+        """
+        return self.num_records
+
+    def close(self) -> None:
+        """Close this book. It can't be used afterwards.
+        """
+        if self._map is not None:
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self) -> 'OpeningBook':
+        """Return this book, so it can be used in a with statement.
+        """
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Close this book at the end of a with statement.
+        """
+        self.close()
+
+    def _find(self, key: int) -> Optional[Tuple[int, int]]:
+        """Return the move index and score stored for <key>, or None if
+        <key> isn't in this book.
+        """
+        low, high = 0, self.num_records
+        while low < high:
+            middle = (low + high) // 2
+            record = RECORD.unpack_from(self._map, middle * RECORD.size)
+            if record[0] < key:
+                low = middle + 1
+            elif record[0] > key:
+                high = middle
+            else:
+                return record[1], record[2]
+        return None
+
+    def lookup(self, state: StonehengeGameState) -> Optional[Tuple[str,
+                                                                  int]]:
+        """Return the best move from <state> and the score of <state> for
+        its current player, or None if <state> isn't in this book.
+
+        >>> import tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'book.bin')
+        >>> write_book(build_book(2, 2), path)
+        >>> with OpeningBook(path) as book:
+        ...     state = StonehengeGameState(True, 2).make_move('A')
+        ...     move, score = book.lookup(state)
+        ...     alphabeta_solve(StonehengeGame(True, 2), state)[1] == score
+        ...     move in state.get_possible_moves()
+        ...     book.lookup(state.make_move(move)) is None
+        True
+        True
+        True
+        """
+        if self._map is None:
+            return None
+        canonical, moves = canonicalize(state)
+        record = self._find(canonical.zobrist)
+        if record is None:
+            return None
+        move_index, score = record
+        # moves maps the cells of state to the cells of the canonical
+        # state, and the book move is a cell of the canonical state.
+        book_move = get_cells(state.board_length)[move_index]
+        for move in state.get_possible_moves():
+            if moves[move] == book_move:
+                return move, score
+        return None
+
+
+# The books opened by book_strategy, by path.
+_BOOKS = {}  # type: Dict[str, Optional[OpeningBook]]
+
+
+def _default_book(board_length: int) -> Optional[OpeningBook]:
+    """Return the default book for <board_length>, or None if there isn't
+    one. Each book is only opened once.
+    """
+    path = DEFAULT_BOOK.format(board_length)
+    if path not in _BOOKS:
+        _BOOKS[path] = OpeningBook(path) if os.path.exists(path) else None
+    return _BOOKS[path]
+
+
+def book_strategy(game: Union[StonehengeGame, SubtractSquareGame],
+                  book: OpeningBook = None,
+                  fallback: Any = timed_strategy,
+                  stats: SearchStats = None) -> Union[str, int]:
+    """
+    Return a move for <game> from an opening book, or from <fallback> once
+    the game has left the book.
+
+    If <book> isn't given, the book at DEFAULT_BOOK for the size of the
+    board is used, if it exists. SubtractSquare games always use
+    <fallback>.
+
+    If <stats> is given, the book lookup is counted in it as a cache
+    lookup, and it is passed on to <fallback>.
+
+    >>> import tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'book.bin')
+    >>> write_book(build_book(2, 1), path)
+    >>> sh = StonehengeGame(True, 2)
+    >>> book = OpeningBook(path)
+    >>> stats = SearchStats()
+    >>> move = book_strategy(sh, book, stats=stats)
+    >>> move in sh.current_state.get_possible_moves()
+    True
+    >>> stats.cache_hits
+    1
+    >>> book.close()
+    """
+    state = game.current_state
+    move = None
+    if stats is not None:
+        stats.start()
+    if isinstance(state, StonehengeGameState):
+        if book is None:
+            book = _default_book(state.board_length)
+        if book is not None:
+            found = book.lookup(state)
+            if stats is not None:
+                stats.lookup(found is not None)
+                if found is not None:
+                    stats.visit(0)
+            if found is not None:
+                move = found[0]
+    if move is None:
+        move = fallback(game) if stats is None else fallback(game,
+                                                             stats=stats)
+    if stats is not None:
+        stats.stop()
+    return move
+
+
+def main(args: List[str] = None) -> None:
+    """Build an opening book from the command line arguments <args>.
+    """
+    parser = argparse.ArgumentParser(
+        description='Build a Stonehenge opening book.')
+    parser.add_argument('--size', type=int, required=True,
+                        help='the side length of the board')
+    parser.add_argument('--plies', type=int, default=2,
+                        help='solve every position before this many moves')
+    parser.add_argument('--output', default=None,
+                        help='the book file to write (by default, the '
+                             'file book_strategy looks for)')
+    options = parser.parse_args(args)
+    output = options.output or DEFAULT_BOOK.format(options.size)
+
+    start = time.perf_counter()
+    records = build_book(options.size, options.plies)
+    write_book(records, output)
+    print('Solved {} positions in {:.1f}s and wrote them to {}'.format(
+        len(records), time.perf_counter() - start, output))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        main()
+    else:
+        import doctest
+        doctest.testmod()
+        from python_ta import check_all
+        check_all(config="a2_pyta.txt")
@@ -0,0 +1,149 @@
+""" Move generation benchmark
+
+=== CSC148 Winter 2018 ===
+University of Toronto
+Assignment 2
+Submitted by: Eric Koehli
+
+=== Module Description ===
+This module counts the positions a fixed number of moves ahead of a game
+state (known as perft), which measures how fast a game's moves are made
+without any strategy on top. Since the counts only depend on the rules of
+the game, they also catch any optimisation that changes the rules.
+
+From the command line:
+
+    python perft.py --game h --size 3 --depth 4
+    python perft.py --game s --total 40 --depth 6 --memory
+"""
+import argparse
+import time
+import tracemalloc
+from typing import Any, Dict, List
+from stonehenge import StonehengeGameState
+from stonehenge_bitboard import StonehengeBitboardState
+from subtract_square_state import SubtractSquareState
+
+
+def perft(state: Any, depth: int) -> int:
+    """Return the number of positions exactly <depth> moves after <state>.
+    A game that is over before then adds no positions.
+
+    <state> is left as it was.
+
+    >>> perft(StonehengeGameState(True, 1), 1)
+    3
+    >>> perft(StonehengeGameState(True, 1), 2)
+    0
+    >>> perft(SubtractSquareState(True, 10), 2)
+    6
+    """
+    if depth == 0:
+        return 1
+    # The moves are applied to private copies, so <state> is never changed.
+    return sum(divide(state, depth).values())
+
+
+def divide(state: Any, depth: int) -> Dict[Any, int]:
+    """Return how many of the positions <depth> moves after <state> follow
+    each of the moves from <state>.
+
+    This is for finding which move two perft counts disagree under.
+
+    >>> divide(SubtractSquareState(True, 10), 2)
+    {1: 3, 4: 2, 9: 1}
+    """
+    counts = {}
+    for move in state.get_possible_moves():
+        counts[move] = _perft(state.make_move(move), depth - 1)
+    return counts
+
+
+def _perft(state: Any, depth: int) -> int:
+    """Return perft(state, depth), applying and undoing moves on <state>
+    if it supports them. The moves one move before <depth> are only
+    counted, not made.
+    """
+    if depth == 0:
+        return 1
+    moves = state.get_possible_moves()
+    if depth == 1:
+        return len(moves)
+    total = 0
+    if isinstance(state, (StonehengeGameState, SubtractSquareState)):
+        for move in moves:
+            state.apply(move)
+            try:
+                total += _perft(state, depth - 1)
+            finally:
+                state.undo()
+    else:
+        for move in moves:
+            total += _perft(state.make_move(move), depth - 1)
+    return total
+
+
+def _make_state(options: argparse.Namespace) -> Any:
+    """Return the starting state described by the command line <options>.
+    """
+    if options.game == 's':
+        return SubtractSquareState(True, options.total)
+    if options.bitboard:
+        return StonehengeBitboardState(True, options.size)
+    return StonehengeGameState(True, options.size)
+
+
+def main(args: List[str] = None) -> None:
+    """Run perft from the command line arguments <args> and report the
+    number of positions, the positions per second and, if asked for, the
+    memory allocated.
+    """
+    parser = argparse.ArgumentParser(
+        description='Count the positions a number of moves ahead.')
+    parser.add_argument('--game', choices=['h', 's'], default='h',
+                        help="'h' for Stonehenge, 's' for SubtractSquare")
+    parser.add_argument('--size', type=int, default=2,
+                        help='the side length of a Stonehenge board')
+    parser.add_argument('--bitboard', action='store_true',
+                        help='use StonehengeBitboardState')
+    parser.add_argument('--total', type=int, default=20,
+                        help='the starting total of SubtractSquare')
+    parser.add_argument('--depth', type=int, default=3,
+                        help='the number of moves to look ahead')
+    parser.add_argument('--memory', action='store_true',
+                        help='run again with tracemalloc to report memory')
+    options = parser.parse_args(args)
+
+    for depth in range(1, options.depth + 1):
+        state = _make_state(options)
+        start = time.perf_counter()
+        nodes = perft(state, depth)
+        elapsed = time.perf_counter() - start
+        rate = nodes / elapsed if elapsed > 0 else float('inf')
+        print('depth {:2}: {:12} positions in {:8.3f}s ({:,.0f}/s)'.format(
+            depth, nodes, elapsed, rate))
+
+    if options.memory:
+        # Tracing slows everything down, so it gets a run of its own.
+        state = _make_state(options)
+        tracemalloc.start()
+        before = tracemalloc.take_snapshot()
+        perft(state, options.depth)
+        after = tracemalloc.take_snapshot()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        blocks = sum(stat.count_diff
+                     for stat in after.compare_to(before, 'filename'))
+        print('depth {:2}: peak memory {:,} bytes, {:,} blocks left '
+              'allocated'.format(options.depth, peak, blocks))
+
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        main()
+    else:
+        import doctest
+        doctest.testmod()
+        from python_ta import check_all
+        check_all(config="a2_pyta.txt")
@@ -0,0 +1,79 @@
+"""
+Unittests for perft, the move generation benchmark.
+
+The position counts below are regression fixtures: they only depend on the
+rules of the games, so any change to how moves are generated or made that
+changes them has changed the rules. They were checked against a plain
+recursive count that only uses make_move.
+"""
+
+import unittest
+
+from perft import perft, divide
+from stonehenge import StonehengeGameState
+from stonehenge_bitboard import StonehengeBitboardState
+from subtract_square_state import SubtractSquareState
+
+# (side length, depth, positions)
+STONEHENGE_PERFT = [(1, 1, 3), (1, 2, 0),
+                    (2, 1, 7), (2, 2, 42), (2, 3, 210), (2, 4, 768),
+                    (2, 5, 2268), (2, 6, 2256), (2, 7, 1440), (2, 8, 0),
+                    (3, 3, 1320), (3, 4, 11880), (3, 5, 95040),
+                    (4, 4, 73440), (5, 3, 13800), (7, 2, 1722)]
+
+# (starting total, depth, positions)
+SUBTRACT_SQUARE_PERFT = [(20, 1, 4), (20, 2, 13), (20, 3, 26),
+                         (20, 4, 54), (20, 5, 92), (50, 4, 467),
+                         (100, 6, 42683)]
+
+
+class PerftUnitTests(unittest.TestCase):
+    def test_stonehenge_perft(self):
+        """
+        Test perft on empty Stonehenge boards.
+        """
+        for size, depth, expected in STONEHENGE_PERFT:
+            for p1_starts in [True, False]:
+                positions = perft(StonehengeGameState(p1_starts, size), depth)
+                self.assertEqual(positions, expected,
+                                 ("perft on a Stonehenge board with " +
+                                  "side-length {} to depth {} should " +
+                                  "count {} positions, but counted {}.").format(
+                                     size, depth, expected, positions))
+
+    def test_stonehenge_bitboard_perft(self):
+        """
+        Test that the bitboard state counts the same positions.
+        """
+        for size, depth, expected in STONEHENGE_PERFT:
+            positions = perft(StonehengeBitboardState(True, size), depth)
+            self.assertEqual(positions, expected,
+                             ("perft on a Stonehenge bitboard with " +
+                              "side-length {} to depth {} should count " +
+                              "{} positions, but counted {}.").format(
+                                 size, depth, expected, positions))
+
+    def test_subtract_square_perft(self):
+        """
+        Test perft on SubtractSquare.
+        """
+        for total, depth, expected in SUBTRACT_SQUARE_PERFT:
+            positions = perft(SubtractSquareState(True, total), depth)
+            self.assertEqual(positions, expected,
+                             ("perft on SubtractSquare from {} to depth {} " +
+                              "should count {} positions, but counted " +
+                              "{}.").format(total, depth, expected, positions))
+
+    def test_perft_keeps_state(self):
+        """
+        Test that perft and divide leave the state they are given as it was.
+        """
+        state = StonehengeGameState(True, 3).make_move('D')
+        before = repr(state)
+        self.assertEqual(sum(divide(state, 3).values()), perft(state, 3))
+        self.assertEqual(repr(state), before,
+                         "perft should not change the state it is given.")
+
+
+if __name__ == "__main__":
+    unittest.main()
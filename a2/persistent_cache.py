@@ -0,0 +1,272 @@
+""" Persistent solution cache
+
+=== CSC148 Winter 2018 ===
+University of Toronto,
+Computer Science
+Assignment 2
+__author__ = 'Eric Koehli'
+
+=== Module Description ===
+This module contains a cache of solved scores that is kept on disk, so the
+states solved in one game (or one run of the program) don't have to be
+solved again in the next. It has the same get and put as a
+TranspositionTable, so it can be passed as the table of
+recursive_minimax_strategy or alphabeta_strategy.
+
+A cache at <path> is made of two files of fixed-size records (a 64-bit
+key and a signed 8-bit score each):
+    - <path>.idx, the index: the records sorted by key, memory-mapped and
+      searched by binary search, so opening even a big cache is quick.
+    - <path>.log, the log: the records put since the index was last
+      rebuilt, in the order they were put. New records are only ever
+      appended, and the log is read into memory when the cache is opened.
+Compacting merges the log into a new index and empties the log. A record
+in the log takes the place of a record for the same key in the index, and
+a record cut short (e.g. by a crash) at the end of the log is ignored.
+
+Only one process should have a cache open for writing at a time.
+"""
+import mmap
+import os
+import struct
+from typing import Any, Dict, Optional
+
+# The layout of one record: key, score.
+RECORD = struct.Struct('<Qb')
+
+_MASK = (1 << 64) - 1
+
+
+class PersistentCache:
+    """A cache of solved scores stored in an index and a log file.
+
+    === Public Attributes ===
+    path:
+         The path of the cache, without the .idx and .log suffixes.
+    compact_every:
+         The number of records the log may hold before it is compacted
+         into the index.
+    hits:
+         The number of lookups that found an entry.
+    misses:
+         The number of lookups that didn't find an entry.
+    """
+    path: str
+    compact_every: int
+    hits: int
+    misses: int
+    # === Private Attributes ===
+    # _recent:
+    #     The records in the log, by key.
+    # _log:
+    #     The log file, open for appending.
+    # _index_file:
+    #     The index file.
+    # _index:
+    #     The memory map of the index file, or None if the index is empty
+    #     (an empty file can't be mapped).
+    # _num_indexed:
+    #     The number of records in the index.
+    _recent: Dict[int, int]
+    _log: Any
+    _index_file: Any
+    _index: Optional[mmap.mmap]
+    _num_indexed: int
+
+    def __init__(self, path: str, compact_every: int = 100000) -> None:
+        """Open the cache at <path>, making it if it doesn't exist.
+
+        Raise a ValueError if <compact_every> isn't positive.
+        """
+        if compact_every <= 0:
+            raise ValueError('compact_every must be positive')
+        self.path, self.compact_every = path, compact_every
+        self.hits, self.misses = 0, 0
+        self._recent = {}
+        log_path = path + '.log'
+        if os.path.exists(log_path):
+            with open(log_path, 'rb') as log_file:
+                data = log_file.read()
+            whole = len(data) - len(data) % RECORD.size
+            for key, score in RECORD.iter_unpack(data[:whole]):
+                self._recent[key] = score
+            if whole != len(data):
+                # Drop the record that was cut short.
+                with open(log_path, 'r+b') as log_file:
+                    log_file.truncate(whole)
+        self._log = open(log_path, 'ab')
+        self._index_file, self._index, self._num_indexed = None, None, 0
+        self._open_index()
+
+    def _open_index(self) -> None:
+        """Open and memory-map the index file, making it if it doesn't
+        exist.
+        """
+        index_path = self.path + '.idx'
+        if not os.path.exists(index_path):
+            open(index_path, 'wb').close()
+        self._index_file = open(index_path, 'rb')
+        size = os.fstat(self._index_file.fileno()).st_size
+        self._num_indexed = size // RECORD.size
+        self._index = None
+        if size > 0:
+            self._index = mmap.mmap(self._index_file.fileno(), 0,
+                                    access=mmap.ACCESS_READ)
+
+    def _close_index(self) -> None:
+        """Close the index file and its memory map.
+        """
+        if self._index is not None:
+            self._index.close()
+        self._index_file.close()
+
+    def _find(self, key: int) -> Optional[int]:
+        """Return the score stored for <key> in the index, or None if it
+        isn't there.
+        """
+        low, high = 0, self._num_indexed
+        while low < high:
+            middle = (low + high) // 2
+            record = RECORD.unpack_from(self._index, middle * RECORD.size)
+            if record[0] < key:
+                low = middle + 1
+            elif record[0] > key:
+                high = middle
+            else:
+                return record[1]
+        return None
+
+    def _lookup(self, key: int) -> Optional[int]:
+        """Return the score stored for <key>, or None if there isn't one.
+        This doesn't count as a lookup.
+        """
+        key &= _MASK
+        score = self._recent.get(key)
+        if score is None:
+            score = self._find(key)
+        return score
+
+    def __len__(self) -> int:
+        """Return an upper bound on the number of entries in this cache:
+        a key in both the log and the index is counted twice until the
+        next compaction.
+        """
+        return self._num_indexed + len(self._recent)
+
+    def __contains__(self, key: int) -> bool:
+        """Return whether <key> has an entry in this cache. This doesn't
+        count as a lookup.
+        """
+        return self._lookup(key) is not None
+
+    def get(self, key: int) -> Optional[int]:
+        """Return the score stored for <key>, or None if there isn't one.
+
+        >>> import tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'cache')
+        >>> with PersistentCache(path) as cache:
+        ...     cache.put(7, 1)
+        ...     cache.get(7), cache.get(8)
+        (1, None)
+        >>> with PersistentCache(path) as cache:
+        ...     cache.get(7), cache.hits
+        (1, 1)
+        """
+        score = self._lookup(key)
+        if score is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return score
+
+    def put(self, key: int, score: int) -> None:
+        """Store <score>, an integer from -128 to 127, for <key>, appending
+        it to the log unless it is already stored. The log is compacted once
+        it holds compact_every records.
+        """
+        key &= _MASK
+        if self._lookup(key) == score:
+            return
+        self._recent[key] = score
+        self._log.write(RECORD.pack(key, score))
+        if len(self._recent) >= self.compact_every:
+            self.compact()
+
+    def flush(self) -> None:
+        """Write the records put so far to the log file.
+        """
+        self._log.flush()
+
+    def compact(self) -> None:
+        """Merge the log into a new index, and empty the log.
+
+        The new index is written to a temporary file that then replaces
+        the old one, so a crash part way through leaves the old index and
+        the log as they were.
+
+        >>> import tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), 'cache')
+        >>> with PersistentCache(path) as cache:
+        ...     for key in [5, 3, 9]:
+        ...         cache.put(key, -1)
+        ...     cache.compact()
+        ...     cache.put(3, 1)
+        ...     cache.get(3), cache.get(5), len(cache)
+        (1, -1, 4)
+        >>> with PersistentCache(path) as cache:
+        ...     cache.compact()
+        ...     cache.get(3), len(cache), os.path.getsize(path + '.log')
+        (1, 3, 0)
+        """
+        if not self._recent:
+            return
+        records = {}
+        if self._index is not None:
+            for key, score in RECORD.iter_unpack(self._index):
+                records[key] = score
+        records.update(self._recent)
+        temp_path = self.path + '.idx.tmp'
+        with open(temp_path, 'wb') as temp_file:
+            for key in sorted(records):
+                temp_file.write(RECORD.pack(key, records[key]))
+            temp_file.flush()
+            os.fsync(temp_file.fileno())
+        self._close_index()
+        os.replace(temp_path, self.path + '.idx')
+        self._open_index()
+        # Every record in the log is in the new index now.
+        self._log.flush()
+        self._log.truncate(0)
+        self._recent = {}
+
+    def close(self) -> None:
+        """Write out the log and close this cache. It can't be used
+        afterwards.
+        """
+        self._log.close()
+        self._close_index()
+
+    def __enter__(self) -> 'PersistentCache':
+        """Return this cache, so it can be used in a with statement.
+        """
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Close this cache at the end of a with statement.
+        """
+        self.close()
+
+    def hit_rate(self) -> float:
+        """Return the fraction of lookups that found an entry.
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
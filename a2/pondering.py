@@ -0,0 +1,203 @@
+""" Pondering
+
+=== CSC148 Winter 2018 ===
+University of Toronto,
+Computer Science
+Assignment 2
+__author__ = 'Eric Koehli'
+
+=== Module Description ===
+This module contains a Ponderer, which keeps searching while the opponent
+is thinking about their move. Once it has picked a move, it solves the
+states after each of the opponent's replies, most likely first, in a
+background thread and keeps the scores in its transposition table. When
+the opponent's actual reply comes, the best move from it is often ready,
+and otherwise the search for it finds part of what it needs in the table.
+
+The pondering thread is stopped as soon as the next move is asked for, so
+it never delays a move. Pondering is free while a person is thinking
+(waiting for input doesn't hold up the thread); against another strategy
+in the same process, the two take turns on the same processor.
+"""
+import threading
+import weakref
+from typing import Any, Dict, Optional, Union
+from stonehenge import StonehengeGame, StonehengeGameState
+from subtract_square_game import SubtractSquareGame
+from subtract_square_state import SubtractSquareState
+from move_ordering import MoveOrderer
+from search_stats import SearchStats
+from strategy import (alphabeta_solve, alphabeta_strategy, _SearchStopped,
+                      _StoppableTable)
+from transposition import TranspositionTable
+
+
+class Ponderer:
+    """
+    Picks moves with alpha-beta, and searches the opponent's replies to
+    each move in a background thread until the next move is asked for.
+
+    === Public Attributes ===
+    table:
+         The table the scores of solved states are kept in, by both the
+         searches for moves and the pondering.
+    orderer:
+         The move orderer shared by every search, which also decides which
+         of the opponent's replies are searched first.
+    pondered:
+         The number of the opponent's replies the last ponder solved.
+    answers:
+         Maps the state after each reply the last ponder solved to the best
+         move from it.
+    """
+    table: TranspositionTable
+    orderer: MoveOrderer
+    pondered: int
+    answers: Dict[Any, Union[str, int]]
+    # === Private Attributes ===
+    # _thread:
+    #     The thread pondering, or None if there isn't one.
+    # _stopping:
+    #     Set to tell the thread to stop.
+    _thread: Optional[threading.Thread]
+    _stopping: threading.Event
+
+    def __init__(self, table: TranspositionTable = None) -> None:
+        """Initialize a new Ponderer that keeps its scores in <table> (a
+        new TranspositionTable if none is given).
+        """
+        self.table = TranspositionTable() if table is None else table
+        self.orderer = MoveOrderer()
+        self.pondered, self.answers = 0, {}
+        self._thread, self._stopping = None, threading.Event()
+
+    def choose(self, game: Union[StonehengeGame, SubtractSquareGame],
+               stats: SearchStats = None) -> Union[str, int]:
+        """Return a move for <game> picked by alpha-beta, and start
+        pondering the opponent's replies to it. The search is counted in
+        <stats> if it is given.
+
+        If the last ponder already solved game.current_state, its best move
+        is returned without searching again.
+
+        >>> sh = StonehengeGame(True, 2)
+        >>> ponderer = Ponderer()
+        >>> move = ponderer.choose(sh)
+        >>> ponderer.wait()
+        >>> sh.current_state = sh.current_state.make_move(move)
+        >>> replies = sh.current_state.get_possible_moves()
+        >>> ponderer.pondered == len(replies)
+        True
+        >>> sh.current_state = sh.current_state.make_move(replies[0])
+        >>> misses = ponderer.table.misses
+        >>> move = ponderer.choose(sh)
+        >>> ponderer.table.misses == misses
+        True
+        >>> ponderer.stop()
+        """
+        self.stop()
+        if stats is not None:
+            stats.start()
+        move = self.answers.get(game.current_state)
+        if stats is not None:
+            stats.lookup(move is not None)
+        if move is None:
+            move = alphabeta_strategy(game, self.orderer, stats, self.table)
+        elif stats is not None:
+            stats.visit(0)
+        if stats is not None:
+            stats.stop()
+        self.start(game, game.current_state.make_move(move))
+        return move
+
+    def start(self, game: Union[StonehengeGame, SubtractSquareGame],
+              state: Union[StonehengeGameState,
+                           SubtractSquareState]) -> None:
+        """Start pondering the opponent's replies from <state> in <game>,
+        stopping any pondering that is already going on.
+        """
+        self.stop()
+        self.pondered, self.answers = 0, {}
+        self._thread = threading.Thread(target=self._ponder,
+                                        args=(game, state), daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop pondering, and wait for the thread to finish.
+        """
+        if self._thread is not None:
+            self._stopping.set()
+            self._thread.join()
+            self._thread = None
+            self._stopping.clear()
+
+    def wait(self) -> None:
+        """Wait for the pondering to finish on its own.
+        """
+        if self._thread is not None:
+            self._thread.join()
+
+    def _ponder(self, game: Union[StonehengeGame, SubtractSquareGame],
+                state: Union[StonehengeGameState,
+                             SubtractSquareState]) -> None:
+        """Solve the state after each of the opponent's replies from
+        <state>, most likely first, until every one is solved or the
+        Ponderer is told to stop.
+
+        The best move from each state is kept in answers, and the scores
+        of the states searched stay in the table.
+        """
+        if game.is_over(state):
+            return
+        table = _StoppableTable(self.table, self._stopping)
+        replies = self.orderer.order(state, state.get_possible_moves())
+        try:
+            for reply in replies:
+                new_state = state.make_move(reply)
+                if not game.is_over(new_state):
+                    self.answers[new_state] = alphabeta_solve(
+                        game, new_state, self.orderer, table=table)[0]
+                self.pondered += 1
+        except _SearchStopped:
+            pass
+
+
+# The Ponderer pondering_strategy keeps for each game.
+_PONDERERS = weakref.WeakKeyDictionary()
+
+
+def pondering_strategy(game: Union[StonehengeGame, SubtractSquareGame],
+                       stats: SearchStats = None) -> Union[str, int]:
+    """
+    Return a move for <game> picked by alpha-beta, and keep searching the
+    opponent's replies until the next move is asked for.
+
+    Each game keeps its own Ponderer between calls. Call stop_pondering
+    once the game is over.
+
+    >>> sh = StonehengeGame(True, 2)
+    >>> gs = StonehengeGameState(board_length=2)
+    >>> sh.current_state = gs.make_move('D').make_move('F').make_move('A')
+    >>> pondering_strategy(sh)
+    'E'
+    >>> stop_pondering(sh)
+    """
+    if game not in _PONDERERS:
+        _PONDERERS[game] = Ponderer()
+    return _PONDERERS[game].choose(game, stats)
+
+
+def stop_pondering(game: Union[StonehengeGame, SubtractSquareGame]) -> None:
+    """Stop the pondering pondering_strategy is doing for <game>, if there
+    is any.
+    """
+    ponderer = _PONDERERS.pop(game, None)
+    if ponderer is not None:
+        ponderer.stop()
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
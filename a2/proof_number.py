@@ -0,0 +1,191 @@
+""" Proof-number search
+
+=== CSC148 Winter 2018 ===
+University of Toronto
+Assignment 2
+Submitted by: Eric Koehli
+
+=== Module Description ===
+This module solves games with proof-number search. Every node of the
+search tree has a proof number and a disproof number: the least number of
+unsolved nodes that would have to turn out to be wins (or losses) for the
+root player to prove that the node is a win (or a loss). The search always
+expands a most-proving node, so it only looks at the branches that can
+still change the answer, instead of every branch like minimax does.
+
+The search only uses get_possible_moves and make_move, so it works for
+any GameState whose get_possible_moves is empty once the game is over.
+The player to move in a state with no moves has lost.
+"""
+from typing import Any, Union
+from stonehenge import StonehengeGame
+from subtract_square_game import SubtractSquareGame
+from strategy import timed_strategy
+from wrapper import ProofNode
+from search_stats import SearchStats
+
+# The results of solve.
+PROVEN = 'proven'
+DISPROVEN = 'disproven'
+UNKNOWN = 'unknown'
+
+INFINITY = float('inf')
+
+
+def solve(state: Any, node_limit: int = 100000,
+          stats: SearchStats = None) -> str:
+    """Return PROVEN if the current player of <state> can force a win,
+    DISPROVEN if they can't, and UNKNOWN if that can't be decided without
+    making more than <node_limit> nodes. The search is counted in <stats>
+    if it is given.
+
+    >>> from stonehenge import StonehengeGameState
+    >>> solve(StonehengeGameState(True, 2))
+    'proven'
+    >>> solve(StonehengeGameState(True, 1).make_move('A'))
+    'disproven'
+    >>> from subtract_square_state import SubtractSquareState
+    >>> solve(SubtractSquareState(True, 5)), solve(SubtractSquareState(True, 6))
+    ('disproven', 'proven')
+    >>> solve(StonehengeGameState(True, 4), 10)
+    'unknown'
+    """
+    root = search(state, node_limit, stats)
+    if root.proof == 0:
+        return PROVEN
+    if root.disproof == 0:
+        return DISPROVEN
+    return UNKNOWN
+
+
+def search(state: Any, node_limit: int = 100000,
+           stats: SearchStats = None) -> ProofNode:
+    """Return the root of a proof-number search tree for <state>, searched
+    until the root is solved or <node_limit> nodes have been made.
+
+    The children of a solved node are thrown away, but the root's children
+    are kept, so the move that proves a win can be read off them. The
+    search is counted in <stats> if it is given.
+
+    >>> from stonehenge import StonehengeGameState
+    >>> stats = SearchStats()
+    >>> root = search(StonehengeGameState(True, 1), stats=stats)
+    >>> stats.nodes, stats.terminal_nodes, stats.peak_frontier
+    (1, 3, 3)
+    """
+    root = ProofNode(state, True)
+    _evaluate(root)
+    num_nodes = 1
+    if stats is not None:
+        stats.start()
+        if root.proof != 1:
+            stats.visit(0, 0)
+    while root.proof != 0 and root.disproof != 0 and num_nodes < node_limit:
+        node = _most_proving(root)
+        num_nodes += _expand(node, stats)
+        _update_ancestors(node)
+    if stats is not None:
+        stats.stop()
+    return root
+
+
+def _evaluate(node: ProofNode) -> None:
+    """Set the proof and disproof numbers of the unexpanded <node>.
+    """
+    if node.state.get_possible_moves():
+        node.proof, node.disproof = 1, 1
+    elif node.is_or:
+        # The root player has no moves left, so they lost.
+        node.proof, node.disproof = INFINITY, 0
+    else:
+        node.proof, node.disproof = 0, INFINITY
+
+
+def _most_proving(node: ProofNode) -> ProofNode:
+    """Return the unexpanded node below <node> that is most worth
+    expanding next.
+    """
+    while node.children:
+        if node.is_or:
+            node = min(node.children, key=lambda child: child.proof)
+        else:
+            node = min(node.children, key=lambda child: child.disproof)
+    return node
+
+
+def _expand(node: ProofNode, stats: SearchStats = None) -> int:
+    """Give <node> a child for every move from its state, and return how
+    many children were made.
+
+    The expansion, and the children where the game is over, are counted in
+    <stats> if it is given.
+    """
+    for move in node.state.get_possible_moves():
+        child = ProofNode(node.state.make_move(move), not node.is_or, move,
+                          node)
+        _evaluate(child)
+        node.children.append(child)
+    if stats is not None:
+        ply, ancestor = 0, node
+        while ancestor.parent is not None:
+            ply, ancestor = ply + 1, ancestor.parent
+        stats.visit(ply, len(node.children))
+        for child in node.children:
+            if child.proof == 0 or child.disproof == 0:
+                stats.visit(ply + 1, 0)
+    return len(node.children)
+
+
+def _update_ancestors(node: ProofNode) -> None:
+    """Recompute the proof and disproof numbers of <node> from its children,
+    and then those of every node above it.
+    """
+    while node is not None:
+        if node.is_or:
+            node.proof = min(child.proof for child in node.children)
+            node.disproof = sum(child.disproof for child in node.children)
+        else:
+            node.proof = sum(child.proof for child in node.children)
+            node.disproof = min(child.disproof for child in node.children)
+        if (node.proof == 0 or node.disproof == 0) and node.parent is not None:
+            # Nothing below a solved node is needed any more.
+            for child in node.children:
+                child.children = []
+            node.children = []
+        node = node.parent
+
+
+def proof_number_strategy(game: Union[StonehengeGame, SubtractSquareGame],
+                          node_limit: int = 100000,
+                          fallback: Any = timed_strategy,
+                          stats: SearchStats = None) -> Union[str, int]:
+    """
+    Return a move for <game> that is proven to win, if proof-number search
+    can find one within <node_limit> nodes, and otherwise a move from
+    <fallback>.
+
+    If <stats> is given, the search is counted in it, and it is passed on
+    to <fallback>.
+
+    >>> from stonehenge import StonehengeGameState
+    >>> sh = StonehengeGame(True, 2)
+    >>> gs = StonehengeGameState(board_length=2)
+    >>> sh.current_state = gs.make_move('D').make_move('F').make_move('A')
+    >>> proof_number_strategy(sh)
+    'E'
+    """
+    root = search(game.current_state, node_limit, stats)
+    if root.proof == 0:
+        for child in root.children:
+            if child.proof == 0:
+                return child.move
+    if stats is None:
+        return fallback(game)
+    return fallback(game, stats=stats)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,263 @@
+""" Search statistics
+
+=== CSC148 Winter 2018 ===
+University of Toronto,
+Computer Science
+Assignment 2
+__author__ = 'Eric Koehli'
+
+=== Module Description ===
+This module contains SearchStats, which counts what a strategy did to pick
+a move: how many nodes it searched, how deep it went, how much it had to
+hold at once, how often its cache helped, and how long it took. Every
+strategy takes an optional SearchStats and fills it in, and nothing is
+counted when none is given.
+"""
+import time
+from typing import Any, Dict, Optional
+
+
+class SearchStats:
+    """Counters for one or more searches.
+
+    A search calls visit for every node it reaches, lookup for every cache
+    lookup and prune for every group of moves it skips, and the time
+    between start and stop is added to elapsed.
+
+    === Public Attributes ===
+    nodes:
+         The number of nodes expanded, i.e. whose moves were generated.
+    terminal_nodes:
+         The number of nodes reached where the game was over.
+    evaluated_nodes:
+         The number of nodes scored without generating their moves, at a
+         depth limit or from a cache.
+    children:
+         The number of moves generated by all the expanded nodes.
+    max_depth:
+         The most moves below the root a node was reached at.
+    peak_frontier:
+         The most nodes that had been generated but not yet reached at any
+         one time.
+    cache_hits:
+         The number of cache lookups that found an entry.
+    cache_misses:
+         The number of cache lookups that didn't find an entry.
+    elapsed:
+         The number of seconds spent between start and stop.
+    """
+    nodes: int
+    terminal_nodes: int
+    evaluated_nodes: int
+    children: int
+    max_depth: int
+    peak_frontier: int
+    cache_hits: int
+    cache_misses: int
+    elapsed: float
+    # === Private Attributes ===
+    # _frontier:
+    #     The number of nodes generated but not yet reached.
+    # _started:
+    #     The time.perf_counter() value the clock was started at, or None
+    #     if the clock isn't running.
+    # _running:
+    #     The number of calls to start that haven't been stopped yet.
+    _frontier: int
+    _started: Optional[float]
+    _running: int
+
+    def __init__(self) -> None:
+        """Initialize a new SearchStats with nothing counted.
+        """
+        self.reset()
+
+    def reset(self) -> None:
+        """Set every counter back to zero and stop the clock.
+
+        >>> stats = SearchStats()
+        >>> stats.visit(0, 3)
+        >>> stats.reset()
+        >>> stats.nodes, stats.peak_frontier
+        (0, 0)
+        """
+        self.nodes, self.terminal_nodes, self.evaluated_nodes = 0, 0, 0
+        self.children, self.max_depth, self.peak_frontier = 0, 0, 0
+        self.cache_hits, self.cache_misses = 0, 0
+        self.elapsed = 0.0
+        self._frontier, self._started, self._running = 0, None, 0
+
+    def start(self) -> None:
+        """Start the clock, unless it is already running.
+
+        Calls to start and stop can be nested (e.g. a strategy that falls
+        back on another one), and only the outermost pair is timed.
+
+        >>> stats = SearchStats()
+        >>> stats.start()
+        >>> stats.start()
+        >>> stats.stop()
+        >>> stats.elapsed
+        0.0
+        >>> stats.stop()
+        >>> stats.elapsed > 0
+        True
+        """
+        if self._running == 0:
+            self._started = time.perf_counter()
+        self._running += 1
+
+    def stop(self) -> None:
+        """Stop the clock if this matches the first call to start, and add
+        the time since then to elapsed.
+        """
+        if self._running == 0:
+            return
+        self._running -= 1
+        if self._running == 0:
+            self.elapsed += time.perf_counter() - self._started
+            self._started = None
+
+    def visit(self, ply: int, num_children: int = None) -> None:
+        """Count a node reached <ply> moves below the root.
+
+        <num_children> is the number of moves the search generated from
+        the node: 0 if the game is over there, and None if the node was
+        scored without generating them.
+
+        >>> stats = SearchStats()
+        >>> stats.visit(0, 2)
+        >>> stats.visit(1, 0)
+        >>> stats.visit(1)
+        >>> stats.nodes, stats.terminal_nodes, stats.evaluated_nodes
+        (1, 1, 1)
+        >>> stats.max_depth, stats.peak_frontier
+        (1, 2)
+        """
+        if self._frontier > 0:
+            self._frontier -= 1
+        if ply > self.max_depth:
+            self.max_depth = ply
+        if num_children is None:
+            self.evaluated_nodes += 1
+        elif num_children == 0:
+            self.terminal_nodes += 1
+        else:
+            self.nodes += 1
+            self.children += num_children
+            self._frontier += num_children
+            if self._frontier > self.peak_frontier:
+                self.peak_frontier = self._frontier
+
+    def prune(self, num_moves: int) -> None:
+        """Count <num_moves> generated moves that the search skipped, so
+        they are no longer waiting to be reached.
+        """
+        self._frontier = max(self._frontier - num_moves, 0)
+
+    def lookup(self, hit: bool) -> None:
+        """Count a cache lookup, which found an entry if <hit>.
+        """
+        if hit:
+            self.cache_hits += 1
+        else:
+            self.cache_misses += 1
+
+    def hit_rate(self) -> float:
+        """Return the fraction of cache lookups that found an entry.
+
+        >>> stats = SearchStats()
+        >>> stats.hit_rate()
+        0.0
+        >>> stats.lookup(True)
+        >>> stats.lookup(False)
+        >>> stats.hit_rate()
+        0.5
+        """
+        lookups = self.cache_hits + self.cache_misses
+        if lookups == 0:
+            return 0.0
+        return self.cache_hits / lookups
+
+    def branching_factor(self) -> float:
+        """Return the average number of moves from an expanded node.
+
+        >>> stats = SearchStats()
+        >>> stats.visit(0, 3)
+        >>> stats.visit(1, 2)
+        >>> stats.branching_factor()
+        2.5
+        """
+        if self.nodes == 0:
+            return 0.0
+        return self.children / self.nodes
+
+    def merge(self, other: 'SearchStats', ply: int = 0) -> None:
+        """Add the counts of <other>, a separate search of the subtree of a
+        node <ply> moves below the root (such as one run in another
+        process), to these.
+
+        The elapsed time isn't added, since the searches may have run at
+        the same time.
+
+        >>> stats, other = SearchStats(), SearchStats()
+        >>> stats.visit(0, 3)
+        >>> other.visit(0, 2)
+        >>> other.visit(1, 0)
+        >>> stats.merge(other, 1)
+        >>> stats.nodes, stats.terminal_nodes, stats.max_depth
+        (2, 1, 2)
+        """
+        self.nodes += other.nodes
+        self.terminal_nodes += other.terminal_nodes
+        self.evaluated_nodes += other.evaluated_nodes
+        self.children += other.children
+        self.max_depth = max(self.max_depth, ply + other.max_depth)
+        self.peak_frontier = max(self.peak_frontier, other.peak_frontier)
+        self.cache_hits += other.cache_hits
+        self.cache_misses += other.cache_misses
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters and the rates computed from them, e.g. to be
+        written out as JSON.
+
+        >>> stats = SearchStats()
+        >>> stats.visit(0, 1)
+        >>> sorted(stats.as_dict())  # doctest: +NORMALIZE_WHITESPACE
+        ['branching_factor', 'cache_hit_rate', 'cache_hits', 'cache_misses',
+         'elapsed', 'evaluated_nodes', 'max_depth', 'nodes', 'peak_frontier',
+         'terminal_nodes']
+        """
+        return {'nodes': self.nodes, 'terminal_nodes': self.terminal_nodes,
+                'evaluated_nodes': self.evaluated_nodes,
+                'max_depth': self.max_depth,
+                'peak_frontier': self.peak_frontier,
+                'cache_hits': self.cache_hits,
+                'cache_misses': self.cache_misses,
+                'cache_hit_rate': self.hit_rate(),
+                'branching_factor': self.branching_factor(),
+                'elapsed': self.elapsed}
+
+    def __str__(self) -> str:
+        """Return a one-line summary of these counters.
+
+        >>> stats = SearchStats()
+        >>> stats.visit(0, 2)
+        >>> stats.visit(1, 0)
+        >>> print(stats)
+        1 nodes (1 terminal, 0 evaluated), depth 1, frontier 2, \
+cache hits 0.0%, branching 2.00, 0.000s
+        """
+        return ('{} nodes ({} terminal, {} evaluated), depth {}, '
+                'frontier {}, cache hits {:.1%}, branching {:.2f}, '
+                '{:.3f}s').format(self.nodes, self.terminal_nodes,
+                                  self.evaluated_nodes, self.max_depth,
+                                  self.peak_frontier, self.hit_rate(),
+                                  self.branching_factor(), self.elapsed)
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
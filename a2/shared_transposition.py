@@ -0,0 +1,323 @@
+""" Shared-memory transposition table
+
+=== CSC148 Winter 2018 ===
+University of Toronto,
+Computer Science
+Assignment 2
+__author__ = 'Eric Koehli'
+
+=== Module Description ===
+This module contains a transposition table that lives in shared memory, so
+the worker processes of a parallel search can all use the states the
+others have already searched instead of each searching them again.
+
+The table is a fixed array of slots, one packed 16-byte entry each:
+    - a check word (unsigned 64-bit),
+    - a data word (unsigned 64-bit) holding the value (32-bit float), the
+      depth it was searched to (signed 16-bit), the index of the best move
+      (8-bit, NO_MOVE if there isn't one) and a flag byte that marks the
+      slot as used and says what kind of bound the value is.
+A key is stored in slot key % num_slots, and the check word is the key
+XORed with the data word. There are no locks: if two processes write the
+same slot at once and a reader sees half of each entry, the check word
+won't match the key it is looking for, so the entry just reads as a miss.
+"""
+import struct
+from multiprocessing import shared_memory
+from typing import Any, Dict, Hashable, Optional, Tuple, Union
+
+# The layout of one slot: check word, data word.
+SLOT = struct.Struct('<QQ')
+# The layout of a data word: value, depth, move index, flags.
+DATA = struct.Struct('<fhBB')
+
+# The move index stored when an entry has no best move.
+NO_MOVE = 255
+# The depth stored for a value that was solved all the way to the end of
+# the game, which makes it good for a search of any depth.
+SOLVED = 32767
+
+# The kinds of bound a value can be: the score itself, or a score the
+# actual one is at least (LOWER) or at most (UPPER).
+EXACT = 'exact'
+LOWER = 'lower'
+UPPER = 'upper'
+
+_MASK = (1 << 64) - 1
+# The bits of the flag byte.
+_USED = 1
+_INTEGER = 2
+_BOUND_FLAGS = {EXACT: 0, LOWER: 4, UPPER: 8}
+
+# The shared memory blocks this process has attached to, by name, along
+# with the number of open tables using each one, so a table sent to a
+# worker process many times is only attached once.
+_ATTACHED = {}  # type: Dict[str, Tuple[shared_memory.SharedMemory, int]]
+
+
+class SharedTranspositionTable:
+    """A fixed-size table in shared memory mapping game state keys to
+    values, with the same get and put as a TranspositionTable.
+
+    A table can be passed to other processes (e.g. as an argument of a
+    task for a ProcessPoolExecutor), and they all read and write the same
+    slots. The process that made the table owns it, and should unlink it
+    once every process is done with it.
+
+    Keys must be integers (such as Zobrist keys); only their lowest 64
+    bits are used. Values are stored as 32-bit floats, but a small integer
+    value (such as WIN or LOSE) reads back as the integer it was put as,
+    like it does from a TranspositionTable. When two keys need the same
+    slot, a new entry replaces the old one unless the old one was searched
+    deeper, so solved entries are never replaced by another key's.
+
+    get and put only deal in solved scores, so the table can be passed to
+    the searches that solve the game. A depth-limited search uses
+    get_entry and put's other arguments to store how deep it searched,
+    which move was best and whether the value is only a bound.
+
+    === Public Attributes ===
+    name:
+         The name of the shared memory block, which other processes use to
+         find the table.
+    num_slots:
+         The number of entries the table can hold.
+    hits:
+         The number of lookups in this process that found an entry.
+    misses:
+         The number of lookups in this process that didn't find an entry.
+    """
+    name: str
+    num_slots: int
+    hits: int
+    misses: int
+    # === Private Attributes ===
+    # _memory:
+    #     The shared memory block holding the slots.
+    # _owner:
+    #     Whether this process made the shared memory block.
+    # _closed:
+    #     Whether close has been called on this table.
+    _memory: shared_memory.SharedMemory
+    _owner: bool
+    _closed: bool
+
+    def __init__(self, num_slots: int = 1 << 16, name: str = None) -> None:
+        """Initialize a new empty table with <num_slots> slots, or attach to
+        the existing table called <name> if it is given.
+
+        Raise a ValueError if <num_slots> isn't positive.
+        """
+        if num_slots <= 0:
+            raise ValueError('num_slots must be positive')
+        self.hits, self.misses = 0, 0
+        self._owner, self._closed = name is None, False
+        if name is None:
+            memory = shared_memory.SharedMemory(
+                create=True, size=num_slots * SLOT.size)
+            name = memory.name
+        elif name in _ATTACHED:
+            memory = _ATTACHED[name][0]
+        else:
+            memory = shared_memory.SharedMemory(name)
+        handles = _ATTACHED[name][1] if name in _ATTACHED else 0
+        _ATTACHED[name] = (memory, handles + 1)
+        self._memory, self.name = memory, name
+        self.num_slots = num_slots
+
+    def __getstate__(self) -> Tuple[str, int]:
+        """Return what is sent to another process for this table: its name
+        and size, not its entries.
+        """
+        return self.name, self.num_slots
+
+    def __setstate__(self, state: Tuple[str, int]) -> None:
+        """Attach to the table described by <state> from __getstate__.
+        """
+        name, num_slots = state
+        self.__init__(num_slots, name)
+
+    def __enter__(self) -> 'SharedTranspositionTable':
+        """Return this table, so it can be used in a with statement.
+        """
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        """Close this table at the end of a with statement, and unlink it
+        if this process owns it.
+        """
+        self.close()
+        if self._owner:
+            self.unlink()
+
+    def close(self) -> None:
+        """Close this handle to the table. It can't be used afterwards, but
+        other handles to the same table in this process still can; the
+        process detaches from the table once they are all closed.
+
+        >>> import pickle
+        >>> with SharedTranspositionTable(8) as table:
+        ...     table.put(5, 1)
+        ...     copy = pickle.loads(pickle.dumps(table))
+        ...     copy.close()
+        ...     table.get(5)
+        1
+        """
+        if self._closed:
+            return
+        self._closed = True
+        memory, handles = _ATTACHED[self.name]
+        if handles > 1:
+            _ATTACHED[self.name] = (memory, handles - 1)
+        else:
+            del _ATTACHED[self.name]
+            memory.close()
+
+    def unlink(self) -> None:
+        """Free the shared memory of this table once every process has
+        closed it.
+        """
+        self._memory.unlink()
+
+    def __len__(self) -> int:
+        """Return the number of slots that hold an entry. Every slot is
+        looked at, so this is slow for a big table.
+
+        >>> with SharedTranspositionTable(8) as table:
+        ...     table.put(3, 1)
+        ...     table.put(11, -1)
+        ...     len(table)
+        1
+        """
+        used = 0
+        size = self.num_slots * SLOT.size
+        for _, data in SLOT.iter_unpack(self._memory.buf[:size]):
+            if data != 0:
+                used += 1
+        return used
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Return whether <key> has an entry in this table. This doesn't
+        count as a lookup.
+        """
+        return self._read(key) is not None
+
+    def _read(self, key: int) -> Optional[Tuple[Union[int, float], int,
+                                                 int, str]]:
+        """Return the value, depth, move index and bound stored for <key>,
+        or None if there isn't an entry for it.
+        """
+        key &= _MASK
+        check, data = SLOT.unpack_from(self._memory.buf,
+                                       (key % self.num_slots) * SLOT.size)
+        if data == 0 or check ^ data != key:
+            return None
+        value, depth, move_index, flags = DATA.unpack(
+            data.to_bytes(8, 'little'))
+        if flags & _INTEGER:
+            value = int(value)
+        bound = EXACT
+        if flags & _BOUND_FLAGS[LOWER]:
+            bound = LOWER
+        elif flags & _BOUND_FLAGS[UPPER]:
+            bound = UPPER
+        return value, depth, move_index, bound
+
+    def get(self, key: int) -> Optional[Union[int, float]]:
+        """Return the solved value stored for <key>, or None if there
+        isn't one. An entry from a depth-limited search reads as None.
+
+        >>> with SharedTranspositionTable(8) as table:
+        ...     table.put(3, 1)
+        ...     table.put(5, 1, 4)
+        ...     table.get(3), table.get(4), table.get(5)
+        (1, None, None)
+        """
+        entry = self._read(key)
+        if entry is not None and (entry[1] != SOLVED or entry[3] != EXACT):
+            entry = None
+        if entry is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def get_entry(self, key: int) -> Optional[Tuple[Union[int, float], int,
+                                                   int, str]]:
+        """Return the value, depth, best move index and bound stored for
+        <key>, or None if there isn't an entry for it.
+
+        >>> with SharedTranspositionTable(8) as table:
+        ...     table.put(3, 0.5, 4, 2, LOWER)
+        ...     table.get_entry(3), table.get_entry(4)
+        ((0.5, 4, 2, 'lower'), None)
+        """
+        entry = self._read(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    def put(self, key: int, value: Union[int, float], depth: int = SOLVED,
+            move_index: int = NO_MOVE, bound: str = EXACT) -> None:
+        """Store <value> for <key>, found by a search <depth> moves deep
+        (SOLVED if it went to the end of the game) whose best move was the
+        one at <move_index> in the state's possible moves. <bound> is
+        EXACT if <value> is the value itself, and LOWER or UPPER if the
+        value is only known to be at least or at most <value>.
+
+        The entry in the slot for <key> is replaced unless it is for
+        another key and was searched deeper.
+
+        >>> with SharedTranspositionTable(8) as table:
+        ...     table.put(3, 1, 5)
+        ...     table.put(11, -1, 2)
+        ...     table.get_entry(3)[0], table.get_entry(11)
+        ...     table.put(11, -1)
+        ...     table.get(3), table.get(11)
+        (1, None)
+        (None, -1)
+        """
+        key &= _MASK
+        offset = (key % self.num_slots) * SLOT.size
+        check, data = SLOT.unpack_from(self._memory.buf, offset)
+        if data != 0 and check ^ data != key:
+            if DATA.unpack(data.to_bytes(8, 'little'))[1] > depth:
+                return
+        flags = _USED | _BOUND_FLAGS[bound]
+        if isinstance(value, int):
+            flags |= _INTEGER
+        data = int.from_bytes(DATA.pack(value, depth, move_index, flags),
+                              'little')
+        SLOT.pack_into(self._memory.buf, offset, key ^ data, data)
+
+    def clear(self) -> None:
+        """Remove every entry from this table and reset this process's
+        counters.
+
+        >>> with SharedTranspositionTable(8) as table:
+        ...     table.put(3, 1)
+        ...     table.clear()
+        ...     len(table), table.hits, table.misses
+        (0, 0, 0)
+        """
+        self._memory.buf[:self.num_slots * SLOT.size] = bytes(
+            self.num_slots * SLOT.size)
+        self.hits, self.misses = 0, 0
+
+    def hit_rate(self) -> float:
+        """Return the fraction of lookups in this process that found an
+        entry.
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -8,10 +8,12 @@ Submitted by: Eric Koehli
 === Module Description ===
 This module contains the Stonehenge game and Stonehenge game state.
 """
-from typing import Any, List, Union, Dict, Tuple
-from copy import deepcopy
+from typing import Any, List, Union, Dict, Tuple, Optional
 from game import Game
 from game_state import GameState
+from stonehenge_layout import (LeyLineIndex, get_cells, get_ley_line_index,
+                               get_ley_lines)
+from stonehenge_bitboard import StonehengeBitboardState
 
 
 class StonehengeGame(Game):
@@ -28,10 +30,10 @@ class StonehengeGame(Game):
         Initialize this Game, using p1_starts to find who the first player is.
         If <p1_starts> is true, p1 starts the game. If false, p2 starts.
         """
-        while size not in [1, 2, 3, 4, 5]:
+        while size < 1:
             try:
                 size = int(input('Enter the side length of the board'
-                                 ' between 1 and 5 inclusive: '))
+                                 ' (1 or more): '))
             except ValueError:
                 print("Oops! That wasn't in the correct range... Please "
                       "try again.")
@@ -55,7 +57,8 @@ class StonehengeGame(Game):
               'opponent does.\nGood luck!'
         return res
 
-    def is_over(self, state: 'StonehengeGameState') -> bool:
+    def is_over(self, state: Union['StonehengeGameState',
+                                   StonehengeBitboardState]) -> bool:
         """
         Return whether or not this game is over at state.
 
@@ -71,21 +74,15 @@ class StonehengeGame(Game):
         True
         >>> sh2.is_over(sh_b)
         False
+        >>> from stonehenge_bitboard import StonehengeBitboardState
+        >>> sh.is_over(StonehengeBitboardState(True, 1).make_move('A'))
+        True
         """
-        ones, twos = 0, 0
-        for board_line in state.board:
-            for ch in board_line:
-                if ch == 'p1':
-                    ones += 1
-                elif ch == 'p2':
-                    twos += 1
-
+        if isinstance(state, StonehengeBitboardState):
+            return state.is_over()
         num_ley_lines = len(state.ley_lines)
-        if ones / num_ley_lines >= 0.5:
-            return True
-        elif twos / num_ley_lines >= 0.5:
-            return True
-        return False
+        return (2 * state.claims['p1'] >= num_ley_lines or
+                2 * state.claims['p2'] >= num_ley_lines)
 
     def is_winner(self, player: str) -> bool:
         """
@@ -140,14 +137,35 @@ class StonehengeGameState(GameState):
            cells in that ley-line.
     board:
            A representation of the current stonehenge board.
-           Each sublist contains a row of the board.
+           Each sublist contains a row of the board. The board is only
+           rendered from ley_lines the first time it is asked for.
+    board_length:
+           The side length of the board.
+    claims:
+           The number of ley-lines each player ('p1' and 'p2') has claimed.
+    free_cells:
+           The cells that have not been captured yet, in order of their ids.
+    zobrist:
+           The 64-bit Zobrist key of this state, used as its hash.
     """
     ley_lines: Dict[str, List[str]]
-    board: List[List[str]]
+    board_length: int
+    claims: Dict[str, int]
+    free_cells: List[str]
+    zobrist: int
+    # === Private Attributes ===
+    # _board:
+    #     The rendered board, or None if it hasn't been rendered yet.
+    # _undo_stack:
+    #     One record for every move made with apply that hasn't been undone
+    #     yet, most recent last, or None if apply hasn't been called.
+    _board: Optional[List[List[str]]]
+    _undo_stack: Optional[List[tuple]]
 
     def __init__(self, is_p1_turn: bool = True, board_length: int = 1,
                  ley_lines: Dict[str, List[str]] = None,
-                 board: List[List[str]] = None) -> None:
+                 claims: Dict[str, int] = None,
+                 free_cells: List[str] = None, zobrist: int = None) -> None:
         """
         Initialize this game state and set the current player based on
         is_p1_turn.
@@ -157,135 +175,106 @@ class StonehengeGameState(GameState):
         {'ley_line1': ['@', 'A'], 'ley_line2': ['@', 'B', 'C'], 'ley_line3': \
 ['@', 'A', 'B'], 'ley_line4': ['@', 'C'], 'ley_line5': ['@', 'B'], \
 'ley_line6': ['@', 'C', 'A']}
+        >>> shgs.claims, shgs.free_cells
+        ({'p1': 0, 'p2': 0}, ['A', 'B', 'C'])
         """
         GameState.__init__(self, is_p1_turn)
+        self._board, self._undo_stack = None, None
         if ley_lines is None:
             self.ley_lines = self._build_ley_lines(board_length)
-            self.board = self._make_board(board_length)
         else:
-            self.ley_lines, self.board = ley_lines, board
+            self.ley_lines = ley_lines
+            # A board with side length n always has 3 * (n + 1) ley-lines.
+            board_length = len(ley_lines) // 3 - 1
+        self.board_length = board_length
+
+        # The counters are only rebuilt when they aren't handed down by
+        # make_move, i.e. when the state is built from scratch.
+        if claims is None:
+            claims = {'p1': 0, 'p2': 0}
+            for ley_line in self.ley_lines.values():
+                if ley_line[0] in claims:
+                    claims[ley_line[0]] += 1
+        if free_cells is None:
+            free_cells = [cell for cell in get_cells(board_length)
+                          if any(ley_line[position] == cell
+                                 for ley_line, position
+                                 in self._cell_ley_lines(cell))]
+        self.claims, self.free_cells = claims, free_cells
+        if zobrist is None:
+            zobrist = self._compute_zobrist()
+        self.zobrist = zobrist
+
+    def _compute_zobrist(self) -> int:
+        """Return the Zobrist key of this state, built from scratch.
+
+        make_move keeps the key up to date without calling this.
+        """
+        index = self._index
+        zobrist = index.base_key
+        if self.p1_turn:
+            zobrist ^= index.turn_key
+        for cell, keys in index.cell_keys.items():
+            ley_line, position = index.cell_lines[cell][0]
+            if self.ley_lines[ley_line][position] in keys:
+                zobrist ^= keys[self.ley_lines[ley_line][position]]
+        for ley_line, keys in index.marker_keys.items():
+            if self.ley_lines[ley_line][0] in keys:
+                zobrist ^= keys[self.ley_lines[ley_line][0]]
+        return zobrist
+
+    def _cell_ley_lines(self, cell: str) -> List[Tuple[List[str], int]]:
+        """Return a (ley-line list, position) pair for every ley-line that
+        <cell> sits on.
+        """
+        return [(self.ley_lines[ley_line], position)
+                for ley_line, position in self._index.cell_lines[cell]]
+
+    @property
+    def _index(self) -> LeyLineIndex:
+        """The shared ley-line index for this state's board size.
+        """
+        return get_ley_line_index(self.board_length)
 
     def _build_ley_lines(self, board_length) -> Dict[str, List[str]]:
         """A helper method to create the data structure to hold the ley-line
         information from the game.
         """
-        if board_length == 1:
-            ley_lines = {'ley_line1': ['A'], 'ley_line2': ['B', 'C'],
-                         'ley_line3': ['A', 'B'], 'ley_line4': ['C'],
-                         'ley_line5': ['B'], 'ley_line6': ['C', 'A']}
-        elif board_length == 2:
-            ley_lines = {'ley_line1': ['A', 'C'], 'ley_line2': ['B', 'D', 'F'],
-                         'ley_line3': ['A', 'B'], 'ley_line4': ['E', 'G'],
-                         'ley_line5': ['C', 'D', 'E'],
-                         'ley_line6': ['F', 'G'], 'ley_line7': ['E', 'B'],
-                         'ley_line8': ['F', 'C'], 'ley_line9': ['G', 'D', 'A']}
-        elif board_length == 3:
-            ley_lines = {'ley_line1': ['A', 'C', 'F'],
-                         'ley_line2': ['B', 'D', 'G', 'J'],
-                         'ley_line3': ['A', 'B'], 'ley_line4': ['E', 'H', 'K'],
-                         'ley_line5': ['C', 'D', 'E'], 'ley_line6': ['I', 'L'],
-                         'ley_line7': ['F', 'G', 'H', 'I'],
-                         'ley_line8': ['J', 'K', 'L'],
-                         'ley_line9': ['I', 'E', 'B'], 'ley_line10': ['J', 'F'],
-                         'ley_line11': ['K', 'G', 'C'],
-                         'ley_line12': ['L', 'H', 'D', 'A']}
-        elif board_length == 4:
-            ley_lines = {'ley_line1': ['A', 'C', 'F', 'J'],
-                         'ley_line2': ['B', 'D', 'G', 'K', 'O'],
-                         'ley_line3': ['A', 'B'],
-                         'ley_line4': ['E', 'H', 'L', 'P'],
-                         'ley_line5': ['C', 'D', 'E'],
-                         'ley_line6': ['I', 'M', 'Q'],
-                         'ley_line7': ['F', 'G', 'H', 'I'],
-                         'ley_line8': ['N', 'R'],
-                         'ley_line9': ['J', 'K', 'L', 'M', 'N'],
-                         'ley_line10': ['O', 'P', 'Q', 'R'],
-                         'ley_line11': ['N', 'I', 'E', 'B'],
-                         'ley_line12': ['O', 'J'],
-                         'ley_line13': ['P', 'K', 'F'],
-                         'ley_line14': ['Q', 'L', 'G', 'C'],
-                         'ley_line15': ['R', 'M', 'H', 'D', 'A']}
-        else:
-            ley_lines = {'ley_line1': ['A', 'C', 'F', 'J', 'O'],
-                         'ley_line2': ['B', 'D', 'G', 'K', 'P', 'U'],
-                         'ley_line3': ['A', 'B'],
-                         'ley_line4': ['E', 'H', 'L', 'Q', 'V'],
-                         'ley_line5': ['C', 'D', 'E'],
-                         'ley_line6': ['I', 'M', 'R', 'W'],
-                         'ley_line7': ['F', 'G', 'H', 'I'],
-                         'ley_line8': ['N', 'S', 'X'],
-                         'ley_line9': ['J', 'K', 'L', 'M', 'N'],
-                         'ley_line10': ['T', 'Y'],
-                         'ley_line11': ['O', 'P', 'Q', 'R', 'S', 'T'],
-                         'ley_line12': ['U', 'V', 'W', 'X', 'Y'],
-                         'ley_line13': ['T', 'N', 'I', 'E', 'B'],
-                         'ley_line14': ['U', 'O'],
-                         'ley_line15': ['V', 'P', 'J'],
-                         'ley_line16': ['W', 'Q', 'K', 'F'],
-                         'ley_line17': ['X', 'R', 'L', 'G', 'C'],
-                         'ley_line18': ['Y', 'S', 'M', 'H', 'D', 'A']}
-        for ley_line in ley_lines:
-            if '@' not in ley_lines[ley_line]:
-                ley_lines[ley_line].insert(0, '@')
+        ley_lines = {}
+        for i, cells in enumerate(get_ley_lines(board_length)):
+            ley_lines['ley_line{}'.format(i + 1)] = ['@'] + cells
         return ley_lines
 
-    def _make_board(self, board_length: int) -> List[List[str]]:
-        """Return a list of strings that represents the current state
-        of the stonehenge game's board.
-
-        This is a helper function for __init__
-        """
-        if board_length == 1:
-            board = '      @   @\n     /   /\n@ - A - B\n     \\ / \\\n  @ - ' \
-                    'C   @\n       \\\n        @\n'
-        elif board_length == 2:
-            board = '        @   @\n       /   /\n  @ - A - B   @\n   ' \
-                    '  / \\ / \\ /\n@ - C - D - E\n     \\ / \\ / \\\n  ' \
-                    '@ - F - G   @\n       \\   \\\n        @   @\n'
-        elif board_length == 3:
-            board = '          @   @\n         /   /\n    @ - A - B   @\n   ' \
-                    '    / \\ / \\ /\n  @ - C - D - E   @\n  ' \
-                    '   / \\ / \\ / \\ /\n@ - F - G - H - I\n   ' \
-                    '  \\ / \\ / \\ / \\\n  @ - J - K - L   @\n    ' \
-                    '   \\   \\   \\\n        @   @   @\n'
-        elif board_length == 4:
-            board = '            @   @\n           /   /\n    ' \
-                    '  @ - A - B   @\n         / \\ / \\ /\n    @ - C - D - E' \
-                    '   @\n       / \\ / \\ / \\ /\n  @ - F - G - H - I   @\n' \
-                    '     / \\ / \\ / \\ / \\ /\n@ - J - K - L - M - N\n  ' \
-                    '   \\ / \\ / \\ / \\ / \\\n  @ - O - P - Q - R   @\n   ' \
-                    '    \\   \\   \\   \\\n        @   @   @   @\n'
-        else:
-            board = '              @   @\n             /   /\n    ' \
-                    '    @ - A - B   @\n           / \\ / \\ /\n    ' \
-                    '  @ - C - D - E   @\n         / \\ / \\ / \\ /\n  ' \
-                    '  @ - F - G - H - I   @\n    ' \
-                    '   / \\ / \\ / \\ / \\ /\n  @ - J - K - L - M - N   @\n ' \
-                    '    / \\ / \\ / \\ / \\ / \\ /\n@ - O - P - Q - R' \
-                    ' - S - T\n     \\ / \\ / \\ / \\ / \\ / \\\n' \
-                    '  @ - U - V - W - X - Y   @\n     ' \
-                    '  \\   \\   \\   \\   \\\n        @   @   @   @   @\n'
-        board = self._organize_board(board)
-        return board
+    @property
+    def board(self) -> List[List[str]]:
+        r"""The board of this state, rendered from the ley-lines the first
+        time it is needed and cached afterwards.
 
-    def _organize_board(self, str_board: str) -> List[List[str]]:
-        """Return a list of a list of strings, where each sublist
-        is a line in the board game.
-
-        This is a helper function for _make_board and __init__.
-        """
-        board = list(str_board)
-        outter_list = []
-        i, j = 0, 0
-        for ch in board:
-            j += 1
-            if ch == '\n':
-                outter_list.append(board[i:j])
-                i = j
-        # remove the last \n
-        length = len(outter_list)
-        outter_list[length - 1].pop()
-        return outter_list
+        >>> shgs = StonehengeGameState().make_move('B')
+        >>> shgs.board[2][:5]
+        ['p1', ' ', '-', ' ', 'A']
+        >>> shgs.board is shgs.board
+        True
+        """
+        if self._board is None:
+            self._board = self._render_board()
+        return self._board
+
+    def _render_board(self) -> List[List[str]]:
+        """Return the board of this state built from the board template of
+        its size, with the captured cells and claimed ley-line markers
+        filled in.
+
+        This is a helper function for board.
+        """
+        index = self._index
+        board = [board_line[:] for board_line in index.template]
+        for cell, (row, column) in index.cell_positions.items():
+            ley_line, position = index.cell_lines[cell][0]
+            board[row][column] = self.ley_lines[ley_line][position]
+        for ley_line, (row, column) in index.marker_positions.items():
+            board[row][column] = self.ley_lines[ley_line][0]
+        return board
 
     def __str__(self) -> str:
         r"""
@@ -334,16 +323,15 @@ class StonehengeGameState(GameState):
                \   \
                 @   @
         """
-        board = deepcopy(self.board)
-        for board_line in board:
-            for i in range(len(board_line)):
-                if board_line[i] == 'p1':
-                    board_line[i] = '1'
-                elif board_line[i] == 'p2':
-                    board_line[i] = '2'
         res = ''
-        for board_line in board:
-            res += ''.join(board_line)
+        for board_line in self.board:
+            for ch in board_line:
+                if ch == 'p1':
+                    res += '1'
+                elif ch == 'p2':
+                    res += '2'
+                else:
+                    res += ch
         return res
 
     def get_possible_moves(self) -> List[str]:
@@ -368,26 +356,9 @@ class StonehengeGameState(GameState):
         >>> second_move.get_possible_moves()
         ['B', 'C', 'E', 'F', 'G']
         """
-        all_cells = ['A', 'B', 'C', 'D', 'E', 'F', 'G', 'H', 'I', 'J', 'K',
-                     'L', 'M', 'N', 'O', 'P', 'Q', 'R', 'S', 'T', 'U', 'V',
-                     'W', 'X', 'Y']
-        legal_moves = []
-        ones, twos = 0, 0
-        for board_line in self.board:
-            for cell in board_line:
-                if cell in all_cells:
-                    legal_moves.append(cell)
-                elif cell == 'p1':
-                    ones += 1
-                elif cell == 'p2':
-                    twos += 1
-
-        num_ley_lines = len(self.ley_lines)
-        if ones / num_ley_lines >= 0.5:
+        if self._is_over('p1') or self._is_over('p2'):
             return []
-        elif twos / num_ley_lines >= 0.5:
-            return []
-        return legal_moves
+        return self.free_cells[:]
 
     def make_move(self, move: str) -> 'StonehengeGameState':
         """
@@ -407,10 +378,22 @@ class StonehengeGameState(GameState):
         False
         """
         new_ley_lines, ley_line_location = self._update_ley_lines(move)
-        new_board = self._update_board(move, ley_line_location)
+        player = self.get_current_player_name()
+        new_claims = dict(self.claims)
+        new_claims[player] += len(ley_line_location)
+        new_free_cells = [cell for cell in self.free_cells if cell != move]
+
+        index = self._index
+        new_zobrist = (self.zobrist ^ index.turn_key ^
+                       index.cell_keys[move][player[1]])
+        for location in ley_line_location:
+            new_zobrist ^= index.marker_keys[index.names[location - 1]][player]
+
         new_state = StonehengeGameState(not self.p1_turn,
                                         ley_lines=new_ley_lines,
-                                        board=new_board)
+                                        claims=new_claims,
+                                        free_cells=new_free_cells,
+                                        zobrist=new_zobrist)
         return new_state
 
     def _update_ley_lines(self, move: str) -> Tuple[Dict[str, List[str]],
@@ -418,144 +401,121 @@ class StonehengeGameState(GameState):
         """Return an updated version of <self.ley_lines> based
         off of <move>.
 
+        Only the ley-lines that <move> sits on are copied; every other
+        ley-line list is shared with <self.ley_lines>.
+
         This is a helper function for make_move.
         """
         if self.get_current_player_name() == 'p1':
             player = '1'
         else:
             player = '2'
-        new_ley_lines = deepcopy(self.ley_lines)
-        for ley_line in new_ley_lines.values():
-            for i in range(len(ley_line)):
-                if ley_line[i] == move:
-                    ley_line[i] = player
-        ley_line_location = self._check_ley_markers(new_ley_lines)
+        new_ley_lines = dict(self.ley_lines)
+        touched = []
+        for ley_line, position in self._index.cell_lines[move]:
+            new_ley_lines[ley_line] = new_ley_lines[ley_line][:]
+            new_ley_lines[ley_line][position] = player
+            touched.append(ley_line)
+        ley_line_location = self._check_ley_markers(new_ley_lines, touched)
         return new_ley_lines, ley_line_location
 
-    def _check_ley_markers(self,
-                           ley_lines: Dict[str, List[str]]) -> Dict[int, str]:
-        """Check all the <ley_lines> to see if the move that was just
-        applied claimed any of ley-lines. Return a dictionary where each
-        key is an int that represents the ley-line that was claimed and the
-        value is a string of which player claimed it.
+    def _check_ley_markers(self, ley_lines: Dict[str, List[str]],
+                           touched: List[str]) -> Dict[int, str]:
+        """Check the <touched> ley-lines in <ley_lines> to see if the move
+        that was just applied claimed any of them. Return a dictionary where
+        each key is an int that represents the ley-line that was claimed and
+        the value is a string of which player claimed it.
         """
         ley_line_location = {}
-        for ley_line in ley_lines:
-            ley_line_num = self._get_ley_line_location(ley_line)
+        for ley_line in touched:
             # ley_lines[ley_line] is a list of one of the ley-lines
-            if '@' not in ley_lines[ley_line]:
+            if ley_lines[ley_line][0] != '@':
                 continue
-            ones, twos = 0, 0
-            for i in range(len(ley_lines[ley_line])):
-                if ley_lines[ley_line][i] == '1':
-                    ones += 1
-                elif ley_lines[ley_line][i] == '2':
-                    twos += 1
-
-            ley_line_length = len(ley_lines[ley_line]) - 1
-            if ones / ley_line_length >= 0.5:
+            ones = ley_lines[ley_line].count('1')
+            twos = ley_lines[ley_line].count('2')
+
+            threshold = self._index.thresholds[ley_line]
+            if ones >= threshold:
                 ley_lines[ley_line][0] = 'p1'
-                ley_line_location[ley_line_num] = 'p1'
-            elif twos / ley_line_length >= 0.5:
+                ley_line_location[self._index.line_ids[ley_line]] = 'p1'
+            elif twos >= threshold:
                 ley_lines[ley_line][0] = 'p2'
-                ley_line_location[ley_line_num] = 'p2'
+                ley_line_location[self._index.line_ids[ley_line]] = 'p2'
         return ley_line_location
 
-    def _get_ley_line_location(self, ley_line: str) -> int:
-        """Return the integer that occurs in <ley_line>.
-
-        This is a helper function for _check_ley_markers.
+    def apply(self, move: str) -> None:
         """
-        nums = []
-        for ch in ley_line:
-            if ch.isdigit():
-                nums.append(ch)
-        str_val = ''.join(nums)
-        return int(str_val)
+        Apply <move> to this state in place. Unlike make_move, no new state
+        is created; use undo to take the move back.
 
-    def _update_board(self, move: str,
-                      ley_line_location: Dict[int, str]) -> List[List[str]]:
-        """Return an updated version of attribute <self.board> based off
-        <move> and <ley_lines>.
+        The lists of the ley-lines through <move> are replaced rather than
+        changed, since they can be shared with other states made by
+        make_move. Don't apply moves to a state that is being used as a
+        dictionary key.
 
-        Part 1: Apply the move by modifying the board.
-        Part 2: Change any ley-line markers, IF needed.
+        >>> shgs = StonehengeGameState(True, 2)
+        >>> before = repr(shgs)
+        >>> shgs.apply('A')
+        >>> shgs.apply('G')
+        >>> shgs == StonehengeGameState(True, 2).make_move('A').make_move('G')
+        True
+        >>> shgs.undo()
+        >>> shgs.undo()
+        >>> repr(shgs) == before
+        True
         """
-        new_board = deepcopy(self.board)
-        if self.get_current_player_name() == 'p1':
-            player = '1'
-        else:
-            player = '2'
-        # Part 1:
-        found = False
-        while not found:
-            for line in new_board:
-                if self._update_board_part_1(move, player, line):
-                    found = True
-
-        # Part 2:
-        for location, player in ley_line_location.items():
-            self._update_board_part_2(location, player, new_board)
-            # seen = 0
-            # for board_line in new_board:
-            #     for i in range(len(board_line)):
-            #         if (board_line[i] == '@' or board_line[i] == 'p1' or
-            #                 board_line[i] == 'p2'):
-            #             seen += 1
-            #             if seen == location:
-            #                 board_line[i] = player
-
-        return new_board
-
-    def _update_board_part_1(self, move: str, player: str,
-                             line: List[str]) -> bool:
-        """Update the board by replacing <move> with the <player>
-        that made the move. Return True iff <line> has been modified.
-        """
-        for i in range(len(line)):
-            if line[i] == move:
-                line[i] = player
-                return True
-        return False
-
-    def _update_board_part_2(self, location: int, player: str,
-                             new_board: List[List[str]]) -> None:
-        """
-        Helper function for _update_board
-        """
-        seen = 0
-        for board_line in new_board:
-            for i in range(len(board_line)):
-                if (board_line[i] == '@' or board_line[i] == 'p1' or
-                        board_line[i] == 'p2'):
-                    seen += 1
-                    if seen == location:
-                        board_line[i] = player
-
-    # def _update_board_part_2b(self, location: int, player: str, seen: int,
-    #                           board_line: List[str], i: int) -> None:
-    #     """
-    #
-    #     """
-    #     if (board_line[i] == '@' or board_line[i] == 'p1' or
-    #             board_line[i] == 'p2'):
-    #         seen += 1
-    #         if seen == location:
-    #             board_line[i] = player
-
-    # def _update_board_part_2b(self, location: int, player: str, seen: int,
-    #                           board_line: List[str]) -> int:
-    #     """Modify <board_line> at the '@' given by <location>
-    #     with <player>. <seen> is the number of '@' symbols
-    #     seen so far.
-    #     """
-    #     for i in range(len(board_line)):
-    #         if (board_line[i] == '@' or board_line[i] == 'p1' or
-    #                 board_line[i] == 'p2'):
-    #             seen += 1
-    #             if seen == location:
-    #                 board_line[i] = player
-    #     return seen
+        player = self.get_current_player_name()
+        index = self._index
+        saved = []
+        for ley_line, position in index.cell_lines[move]:
+            saved.append((ley_line, self.ley_lines[ley_line]))
+            self.ley_lines[ley_line] = self.ley_lines[ley_line][:]
+            self.ley_lines[ley_line][position] = player[1]
+        ley_line_location = self._check_ley_markers(
+            self.ley_lines, [ley_line for ley_line, _ in saved])
+
+        free_index = self.free_cells.index(move)
+        if self._undo_stack is None:
+            self._undo_stack = []
+        self._undo_stack.append((move, saved, len(ley_line_location),
+                                 free_index, self.zobrist, self._board))
+
+        self.claims[player] += len(ley_line_location)
+        del self.free_cells[free_index]
+        self.zobrist ^= index.turn_key ^ index.cell_keys[move][player[1]]
+        for location in ley_line_location:
+            self.zobrist ^= index.marker_keys[index.names[location - 1]][player]
+        self.p1_turn = not self.p1_turn
+        self._board = None
+
+    def undo(self) -> None:
+        """
+        Take back the last move made with apply.
+
+        Raise an IndexError if there is no move to take back.
+
+        >>> shgs = StonehengeGameState(True, 1)
+        >>> shgs.apply('A')
+        >>> shgs.get_possible_moves()
+        []
+        >>> shgs.undo()
+        >>> shgs.get_possible_moves()
+        ['A', 'B', 'C']
+        >>> shgs.undo()
+        Traceback (most recent call last):
+        ...
+        IndexError: no move to undo
+        """
+        if not self._undo_stack:
+            raise IndexError('no move to undo')
+        move, saved, claimed, free_index, zobrist, board = \
+            self._undo_stack.pop()
+        self.p1_turn = not self.p1_turn
+        for ley_line, cells in saved:
+            self.ley_lines[ley_line] = cells
+        self.claims[self.get_current_player_name()] -= claimed
+        self.free_cells.insert(free_index, move)
+        self.zobrist, self._board = zobrist, board
 
     def __repr__(self) -> Any:
         """
@@ -588,6 +548,77 @@ class StonehengeGameState(GameState):
             res += '{}: {}\n'.format(ley_line, self.ley_lines[ley_line])
         return res.strip()
 
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether this state is the same position as <other>, with the
+        same player to move.
+
+        >>> shgs = StonehengeGameState(True, 2)
+        >>> state1 = shgs.make_move('A').make_move('G').make_move('B')
+        >>> state2 = shgs.make_move('B').make_move('G').make_move('A')
+        >>> state1 == state2
+        True
+        >>> shgs.make_move('A') == shgs.make_move('G')
+        False
+        >>> StonehengeGameState(True, 2) == StonehengeGameState(False, 2)
+        False
+        """
+        # Comparing the keys first rules out almost every unequal state
+        # without looking at the ley-lines.
+        return (type(self) is type(other) and
+                self.zobrist == other.zobrist and
+                self.p1_turn == other.p1_turn and
+                self.ley_lines == other.ley_lines)
+
+    def __hash__(self) -> int:
+        """
+        Return the Zobrist key of this state, so states can be used as
+        dictionary keys.
+
+        >>> shgs = StonehengeGameState(True, 3)
+        >>> state1 = shgs.make_move('A').make_move('K').make_move('C')
+        >>> state2 = shgs.make_move('C').make_move('K').make_move('A')
+        >>> hash(state1) == hash(state2)
+        True
+        >>> {state1: 'seen'}[state2]
+        'seen'
+        """
+        return self.zobrist
+
+    def count_captures(self, move: str) -> int:
+        """
+        Return the number of ley-lines the current player would claim by
+        playing <move>.
+
+        >>> shgs = StonehengeGameState(True, 2).make_move('B')
+        >>> shgs.count_captures('A'), shgs.count_captures('D')
+        (1, 0)
+        """
+        player = self.get_current_player_name()[1]
+        captures = 0
+        for ley_line, _ in self._index.cell_lines[move]:
+            if (self.ley_lines[ley_line][0] == '@' and
+                    self.ley_lines[ley_line].count(player) + 1 >=
+                    self._index.thresholds[ley_line]):
+                captures += 1
+        return captures
+
+    def count_contested(self, move: str) -> int:
+        """
+        Return the number of unclaimed ley-lines through <move> that
+        already have at least one captured cell on them.
+
+        >>> shgs = StonehengeGameState(True, 3).make_move('A')
+        >>> shgs.count_contested('C'), shgs.count_contested('I')
+        (1, 0)
+        """
+        contested = 0
+        for ley_line, _ in self._index.cell_lines[move]:
+            cells = self.ley_lines[ley_line]
+            if cells[0] == '@' and ('1' in cells or '2' in cells):
+                contested += 1
+        return contested
+
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
@@ -602,6 +633,13 @@ class StonehengeGameState(GameState):
         >>> new_state = shgs.make_move('A')
         >>> new_state.rough_outcome()
         -1
+        >>> shgs3 = StonehengeGameState(True, 2).make_move('D')
+        >>> shgs3.make_move('A').make_move('C').make_move('E').rough_outcome()
+        0
+        >>> before = str(shgs3)
+        >>> _ = shgs3.rough_outcome()
+        >>> str(shgs3) == before
+        True
         """
         player, opponent = 'p1', 'p2'
         if player != self.get_current_player_name():
@@ -611,52 +649,37 @@ class StonehengeGameState(GameState):
             # Then the current player loses.
             return self.LOSE
 
-        # for each move, check if the player that made the move won
-        for move in self.get_possible_moves():
-            new_state = self.make_move(move)  # opponent is the current player
-            if self._is_over_player(new_state, player):
-                return self.WIN
-
-        for move in self.get_possible_moves():
-            new_state = self.make_move(move)  # opponent is the current player
-            for next_move in new_state.get_possible_moves():
-                next_state = new_state.make_move(next_move)  # player
-                if self._is_over_player(next_state, opponent):
-                    return self.LOSE
-
-            if self._is_over_player(new_state, opponent):
-                return self.LOSE
-
-        return self.DRAW
+        # Whether a move wins is known from how many ley-lines it claims,
+        # so no state needs to be made to find a winning move.
+        moves = self.get_possible_moves()
+        if any(self._wins_with(move) for move in moves):
+            return self.WIN
+
+        # Each move is applied to this state and taken back, and the
+        # opponent's replies to it are checked the same way. The first move
+        # that the opponent can't answer with a win settles the outcome.
+        for move in moves:
+            self.apply(move)  # opponent is the current player
+            try:
+                if not any(self._wins_with(next_move)
+                           for next_move in self.get_possible_moves()):
+                    return self.DRAW
+            finally:
+                self.undo()
+        return self.LOSE
 
     def _is_over(self, opponent: str) -> bool:
-        """Return true iff the game is over.
+        """Return true iff the game is over because <opponent> has claimed
+        at least half of the ley-lines.
         """
-        score = 0
-        for board_line in self.board:
-            for cell in board_line:
-                if cell == opponent:
-                    score += 1
-        num_ley_lines = len(self.ley_lines)
-        if score / num_ley_lines >= 0.5:
-            return True
-        return False
-
-    def _is_over_player(self, state: 'StonehengeGameState',
-                        player: str) -> bool:
-        """Return true iff the game is over.
-        """
-        score = 0
-        for board_line in state.board:
-            for cell in board_line:
-                if cell == player:
-                    score += 1
-
-        num_ley_lines = len(state.ley_lines)
-        if score / num_ley_lines >= 0.5:
-            return True
+        return 2 * self.claims[opponent] >= len(self.ley_lines)
 
-        return False
+    def _wins_with(self, move: str) -> bool:
+        """Return true iff the current player wins the game by playing
+        <move>.
+        """
+        claims = self.claims[self.get_current_player_name()]
+        return 2 * (claims + self.count_captures(move)) >= len(self.ley_lines)
 
     # def is_over_v2(self) -> bool:
     #     """
@@ -0,0 +1,364 @@
+""" --- Stonehenge Bitboard State ---
+
+=== CSC148 Winter 2018 ===
+University of Toronto
+Assignment 2
+Submitted by: Eric Koehli
+
+=== Module Description ===
+This module contains an integer bitboard version of the Stonehenge game
+state. The cell with id i is bit i of an int, and ley-line j is bit j of
+an int. Each player owns one int of captured cells and one int of claimed
+ley-lines, so applying a move is a handful of bitwise operations instead
+of copying the whole board.
+
+StonehengeBitboardState has the same interface as StonehengeGameState,
+so it can be used anywhere a StonehengeGame's current_state is expected:
+
+>>> from stonehenge import StonehengeGame
+>>> sh = StonehengeGame(True, 2)
+>>> sh.current_state = StonehengeBitboardState(True, 2)
+>>> sh.is_over(sh.current_state.make_move('A').make_move('G'))
+False
+
+No strategy makes one on its own yet: a StonehengeBitboardState has to be
+set as the current_state, as above. It has no apply or undo, so the
+searches always use make_move on it.
+"""
+from typing import Any, Dict, List
+from game_state import GameState
+from stonehenge_layout import get_board_rows, get_cells, get_ley_lines
+
+
+class _BitboardTables:
+    """
+    The precomputed tables for a Stonehenge board of one side length.
+
+    === Attributes ===
+    cells: The cells of the board; cells[i] is represented by bit i.
+    cell_index: Maps each cell to its bit position.
+    line_masks: The mask of cells on each ley-line.
+    line_needs: The number of cells a player must capture on each
+                ley-line to claim it.
+    cell_lines: The indices of the ley-lines that each cell sits on.
+    full_mask: The mask containing every cell.
+    template: The pieces of the drawing of a newly initialized board.
+    cell_positions: The position of each cell in template.
+    marker_positions: The position of each ley-line marker in template.
+    """
+    cells: List[str]
+    cell_index: Dict[str, int]
+    line_masks: List[int]
+    line_needs: List[int]
+    cell_lines: List[List[int]]
+    full_mask: int
+    template: List[str]
+    cell_positions: List[int]
+    marker_positions: List[int]
+
+    def __init__(self, board_length: int) -> None:
+        """Build the tables for a board with side length <board_length>.
+        """
+        self.cells = get_cells(board_length)
+        self.cell_index = {cell: i for i, cell in enumerate(self.cells)}
+        self.line_masks, self.line_needs = [], []
+        self.cell_lines = [[] for _ in self.cells]
+        for j, line in enumerate(get_ley_lines(board_length)):
+            mask = 0
+            for cell in line:
+                mask |= 1 << self.cell_index[cell]
+                self.cell_lines[self.cell_index[cell]].append(j)
+            self.line_masks.append(mask)
+            # A ley-line is claimed once a player holds at least half of it.
+            self.line_needs.append((len(line) + 1) // 2)
+        self.full_mask = (1 << len(self.cells)) - 1
+
+        # The pieces of the board drawing, one row after another.
+        self.template = [piece for board_line in get_board_rows(board_length)
+                         for piece in board_line]
+        self.cell_positions = [self.template.index(cell)
+                               for cell in self.cells]
+        self.marker_positions = [i for i in range(len(self.template))
+                                 if self.template[i] == '@']
+
+
+_TABLES = {}  # type: Dict[int, _BitboardTables]
+
+
+def _get_tables(board_length: int) -> _BitboardTables:
+    """Return the shared tables for a board with side length <board_length>,
+    building them the first time they are needed.
+    """
+    if board_length not in _TABLES:
+        _TABLES[board_length] = _BitboardTables(board_length)
+    return _TABLES[board_length]
+
+
+def _popcount(n: int) -> int:
+    """Return the number of set bits in <n>.
+
+    >>> _popcount(0b1011)
+    3
+    """
+    return bin(n).count('1')
+
+
+class StonehengeBitboardState(GameState):
+    """
+    A Stonehenge game state stored as integer bitboards.
+
+    === Public Attributes ===
+    board_length:
+           The side length of the board.
+    p1_cells, p2_cells:
+           The cells captured by each player, one bit per cell.
+    p1_lines, p2_lines:
+           The ley-lines claimed by each player, one bit per ley-line.
+    """
+    board_length: int
+    p1_cells: int
+    p2_cells: int
+    p1_lines: int
+    p2_lines: int
+
+    def __init__(self, is_p1_turn: bool = True, board_length: int = 1,
+                 p1_cells: int = 0, p2_cells: int = 0,
+                 p1_lines: int = 0, p2_lines: int = 0) -> None:
+        """
+        Initialize this game state and set the current player based on
+        is_p1_turn.
+
+        >>> state = StonehengeBitboardState(True, 2)
+        >>> state.p1_cells, state.p2_cells, state.p1_lines, state.p2_lines
+        (0, 0, 0, 0)
+        """
+        GameState.__init__(self, is_p1_turn)
+        self.board_length = board_length
+        self.p1_cells, self.p2_cells = p1_cells, p2_cells
+        self.p1_lines, self.p2_lines = p1_lines, p2_lines
+
+    def __str__(self) -> str:
+        r"""
+        Return a string representation of the current state of the game.
+
+        >>> print(StonehengeBitboardState(True, 2).make_move('E'))
+                @   @
+               /   /
+          @ - A - B   1
+             / \ / \ /
+        @ - C - D - 1
+             \ / \ / \
+          @ - F - G   1
+               \   \
+                @   @
+        """
+        tables = _get_tables(self.board_length)
+        board = tables.template[:]
+        for i, position in enumerate(tables.cell_positions):
+            if self.p1_cells >> i & 1:
+                board[position] = '1'
+            elif self.p2_cells >> i & 1:
+                board[position] = '2'
+        for j, position in enumerate(tables.marker_positions):
+            if self.p1_lines >> j & 1:
+                board[position] = '1'
+            elif self.p2_lines >> j & 1:
+                board[position] = '2'
+        return ''.join(board)
+
+    def is_over(self) -> bool:
+        """Return whether either player has claimed at least half of the
+        ley-lines.
+
+        >>> StonehengeBitboardState(True, 1).is_over()
+        False
+        >>> StonehengeBitboardState(True, 1).make_move('A').is_over()
+        True
+        """
+        num_lines = len(_get_tables(self.board_length).line_masks)
+        return (2 * _popcount(self.p1_lines) >= num_lines or
+                2 * _popcount(self.p2_lines) >= num_lines)
+
+    def get_possible_moves(self) -> List[str]:
+        """
+        Return all possible moves that can be applied to this state.
+
+        >>> state = StonehengeBitboardState(True, 2)
+        >>> state.get_possible_moves()
+        ['A', 'B', 'C', 'D', 'E', 'F', 'G']
+        >>> state.make_move('A').make_move('D').get_possible_moves()
+        ['B', 'C', 'E', 'F', 'G']
+        >>> over = StonehengeBitboardState(True, 1).make_move('A')
+        >>> over.get_possible_moves()
+        []
+        """
+        if self.is_over():
+            return []
+        tables = _get_tables(self.board_length)
+        free = tables.full_mask & ~(self.p1_cells | self.p2_cells)
+        return [tables.cells[i] for i in range(len(tables.cells))
+                if free >> i & 1]
+
+    def make_move(self, move: str) -> 'StonehengeBitboardState':
+        """
+        Return the GameState that results from applying move to this GameState.
+
+        >>> state = StonehengeBitboardState(True, 1).make_move('B')
+        >>> bin(state.p1_cells), bin(state.p1_lines)
+        ('0b10', '0b10110')
+        >>> state.get_current_player_name()
+        'p2'
+        """
+        tables = _get_tables(self.board_length)
+        i = tables.cell_index[move]
+        if self.p1_turn:
+            cells, lines = self.p1_cells | 1 << i, self.p1_lines
+        else:
+            cells, lines = self.p2_cells | 1 << i, self.p2_lines
+
+        # Only the ley-lines through the new cell can change owner.
+        taken = self.p1_lines | self.p2_lines
+        for j in tables.cell_lines[i]:
+            if (not taken >> j & 1 and
+                    _popcount(cells & tables.line_masks[j]) >=
+                    tables.line_needs[j]):
+                lines |= 1 << j
+
+        if self.p1_turn:
+            return StonehengeBitboardState(False, self.board_length,
+                                           cells, self.p2_cells,
+                                           lines, self.p2_lines)
+        return StonehengeBitboardState(True, self.board_length,
+                                       self.p1_cells, cells,
+                                       self.p1_lines, lines)
+
+    def __repr__(self) -> Any:
+        """
+        Return a representation of this state (which can be used for
+        equality testing).
+
+        The representation is the same as the one for StonehengeGameState.
+
+        >>> from stonehenge import StonehengeGameState
+        >>> state = StonehengeBitboardState(True, 2).make_move('D')
+        >>> repr(state) == repr(StonehengeGameState(True, 2).make_move('D'))
+        True
+        """
+        tables = _get_tables(self.board_length)
+        res = 'Current player: {}\n'.format(self.get_current_player_name())
+        for j, line in enumerate(get_ley_lines(self.board_length)):
+            if self.p1_lines >> j & 1:
+                values = ['p1']
+            elif self.p2_lines >> j & 1:
+                values = ['p2']
+            else:
+                values = ['@']
+            for cell in line:
+                i = tables.cell_index[cell]
+                if self.p1_cells >> i & 1:
+                    values.append('1')
+                elif self.p2_cells >> i & 1:
+                    values.append('2')
+                else:
+                    values.append(cell)
+            res += 'ley_line{}: {}\n'.format(j + 1, values)
+        return res.strip()
+
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether this state is the same position as <other>, with the
+        same player to move.
+
+        >>> state = StonehengeBitboardState(True, 2)
+        >>> state.make_move('A').make_move('G').make_move('B') == \
+state.make_move('B').make_move('G').make_move('A')
+        True
+        """
+        return (type(self) is type(other) and
+                self.p1_turn == other.p1_turn and
+                self.board_length == other.board_length and
+                self.p1_cells == other.p1_cells and
+                self.p2_cells == other.p2_cells and
+                self.p1_lines == other.p1_lines and
+                self.p2_lines == other.p2_lines)
+
+    def __hash__(self) -> int:
+        """
+        Return a hash of this state built from its bitboards.
+        """
+        return hash((self.p1_turn, self.board_length, self.p1_cells,
+                     self.p2_cells, self.p1_lines, self.p2_lines))
+
+    def count_captures(self, move: str) -> int:
+        """
+        Return the number of ley-lines the current player would claim by
+        playing <move>.
+
+        >>> state = StonehengeBitboardState(True, 2).make_move('B')
+        >>> state.count_captures('A'), state.count_captures('D')
+        (1, 0)
+        """
+        tables = _get_tables(self.board_length)
+        i = tables.cell_index[move]
+        cells = (self.p1_cells if self.p1_turn else self.p2_cells) | 1 << i
+        taken = self.p1_lines | self.p2_lines
+        return sum(1 for j in tables.cell_lines[i]
+                   if not taken >> j & 1 and
+                   _popcount(cells & tables.line_masks[j]) >=
+                   tables.line_needs[j])
+
+    def count_contested(self, move: str) -> int:
+        """
+        Return the number of unclaimed ley-lines through <move> that
+        already have at least one captured cell on them.
+
+        >>> state = StonehengeBitboardState(True, 3).make_move('A')
+        >>> state.count_contested('C'), state.count_contested('I')
+        (1, 0)
+        """
+        tables = _get_tables(self.board_length)
+        occupied = self.p1_cells | self.p2_cells
+        taken = self.p1_lines | self.p2_lines
+        return sum(1 for j in tables.cell_lines[tables.cell_index[move]]
+                   if not taken >> j & 1 and
+                   occupied & tables.line_masks[j])
+
+    def _wins_with(self, move: str) -> bool:
+        """Return whether the current player wins the game by playing <move>.
+        """
+        lines = self.p1_lines if self.p1_turn else self.p2_lines
+        num_lines = len(_get_tables(self.board_length).line_masks)
+        return 2 * (_popcount(lines) + self.count_captures(move)) >= num_lines
+
+    def rough_outcome(self) -> float:
+        """
+        Return an estimate in interval [LOSE, WIN] of best outcome the current
+        player can guarantee from state self.
+
+        >>> StonehengeBitboardState(True, 1).rough_outcome()
+        1
+        >>> StonehengeBitboardState(True, 2).rough_outcome()
+        0
+        >>> StonehengeBitboardState(True, 1).make_move('A').rough_outcome()
+        -1
+        """
+        if self.is_over():
+            # The player who just moved is the only one who can have won.
+            return self.LOSE
+
+        moves = self.get_possible_moves()
+        if any(self._wins_with(move) for move in moves):
+            return self.WIN
+        for move in moves:
+            new_state = self.make_move(move)
+            if not any(new_state._wins_with(next_move)
+                       for next_move in new_state.get_possible_moves()):
+                return self.DRAW
+        return self.LOSE
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
@@ -0,0 +1,374 @@
+""" Stonehenge board layouts
+
+=== CSC148 Winter 2018 ===
+University of Toronto
+Assignment 2
+Submitted by: Eric Koehli
+
+=== Module Description ===
+This module generates the layout of a Stonehenge board of any side length
+n >= 1. Both StonehengeGameState and StonehengeBitboardState are built
+from these layouts, so the two representations always agree on which
+cells sit on which ley-line.
+
+The board has n + 1 rows of 2, 3, ..., n + 1 cells, then a last row of n
+cells. Every cell has an integer id, counting from 0 row by row, left to
+right, and is labelled A, B, ..., Z, AA, AB, ... in the same order (see
+cell_label).
+
+get_ley_lines returns the ley-lines of a board in order, i.e. the first
+list is 'ley_line1', the second is 'ley_line2', and so on. The ley-lines
+are numbered in the same order that their '@' markers appear when the
+board is read from top to bottom, left to right.
+
+get_board_rows returns the drawing of a newly initialized board. Boards
+with more than 26 cells have two-letter labels, so their drawings are a
+little uneven.
+
+Every board is a triangle with its three corners cut off, so it looks the
+same after any of the 6 rotations and reflections of a triangle. Each
+LeyLineIndex lists these symmetries as permutations of its cells and
+ley-lines.
+"""
+import itertools
+import random
+from typing import Dict, List, Tuple
+
+
+def cell_label(cell_id: int) -> str:
+    """Return the label of the cell with id <cell_id>.
+
+    >>> cell_label(0), cell_label(25), cell_label(26), cell_label(52)
+    ('A', 'Z', 'AA', 'BA')
+    """
+    label = ''
+    cell_id += 1
+    while cell_id > 0:
+        cell_id, letter = divmod(cell_id - 1, 26)
+        label = chr(ord('A') + letter) + label
+    return label
+
+
+def get_cells(board_length: int) -> List[str]:
+    """Return the cells of the board with side length <board_length>, in
+    order of their ids.
+
+    >>> get_cells(1)
+    ['A', 'B', 'C']
+    >>> len(get_cells(5)), get_cells(6)[-1]
+    (25, 'AG')
+    """
+    # The rows have 2, 3, ..., n + 1 cells, and then n more.
+    num_cells = (board_length + 1) * (board_length + 2) // 2 - 1 + board_length
+    return [cell_label(cell_id) for cell_id in range(num_cells)]
+
+
+def _get_rows(board_length: int) -> List[List[str]]:
+    """Return the cells of each row of the board with side length
+    <board_length>, from top to bottom.
+
+    >>> _get_rows(2)
+    [['A', 'B'], ['C', 'D', 'E'], ['F', 'G']]
+    """
+    cells = iter(get_cells(board_length))
+    rows = [[next(cells) for _ in range(length + 1)]
+            for length in range(1, board_length + 1)]
+    rows.append([next(cells) for _ in range(board_length)])
+    return rows
+
+
+def _get_grid(board_length: int) -> Dict[Tuple[int, int], str]:
+    """Return a dictionary mapping the (row, column) position of every cell
+    of the board with side length <board_length> to the cell.
+
+    Rows are numbered from 1 and columns from 0. The first cell of the last
+    row is in column 1, under the second cell of the row above it.
+
+    >>> grid = _get_grid(1)
+    >>> grid[(1, 0)], grid[(1, 1)], grid[(2, 1)]
+    ('A', 'B', 'C')
+    """
+    grid = {}
+    for row, cells in enumerate(_get_rows(board_length), 1):
+        first = 1 if row == board_length + 1 else 0
+        for column, cell in enumerate(cells, first):
+            grid[(row, column)] = cell
+    return grid
+
+
+def _get_column(grid: Dict[Tuple[int, int], str], board_length: int,
+                column: int) -> List[str]:
+    """Return the cells of <grid> in <column>, from top to bottom.
+    """
+    return [grid[(row, column)] for row in range(1, board_length + 2)
+            if (row, column) in grid]
+
+
+def _get_diagonal(grid: Dict[Tuple[int, int], str], board_length: int,
+                  diagonal: int) -> List[str]:
+    """Return the cells of <grid> whose row minus their column is
+    <diagonal>, from bottom to top.
+    """
+    return [grid[(row, row - diagonal)]
+            for row in range(board_length + 1, 0, -1)
+            if (row, row - diagonal) in grid]
+
+
+_LEY_LINES = {}  # type: Dict[int, List[List[str]]]
+
+
+def get_ley_lines(board_length: int) -> List[List[str]]:
+    """Return the cells of every ley-line of the board with side length
+    <board_length>, in order. The lists are shared, so they must not be
+    changed.
+
+    >>> get_ley_lines(1)
+    [['A'], ['B', 'C'], ['A', 'B'], ['C'], ['B'], ['C', 'A']]
+    >>> get_ley_lines(2)[6:]
+    [['E', 'B'], ['F', 'C'], ['G', 'D', 'A']]
+    >>> len(get_ley_lines(10))
+    33
+    """
+    if board_length not in _LEY_LINES:
+        grid = _get_grid(board_length)
+        rows = _get_rows(board_length)
+        # The two markers above the first row, then each row's marker
+        # followed by the marker at the right end of that row.
+        ley_lines = [_get_column(grid, board_length, 0),
+                     _get_column(grid, board_length, 1)]
+        for row in range(1, board_length):
+            ley_lines.append(rows[row - 1])
+            ley_lines.append(_get_column(grid, board_length, row + 1))
+        # The last two rows only have one row marker each, and the last row
+        # is followed by the marker of the diagonal through its right end.
+        ley_lines.extend([rows[-2], rows[-1],
+                          _get_diagonal(grid, board_length, 0)])
+        # The markers below the last row, from left to right.
+        ley_lines.extend(_get_diagonal(grid, board_length, diagonal)
+                         for diagonal in range(board_length, 0, -1))
+        _LEY_LINES[board_length] = ley_lines
+    return _LEY_LINES[board_length]
+
+
+def get_board_rows(board_length: int) -> List[List[str]]:
+    r"""Return the drawing of a newly initialized board with side length
+    <board_length>. Each sublist holds the pieces of one row of the
+    drawing: single characters, and one piece for each cell label. Every
+    row ends with a newline except for the last one.
+
+    >>> print(''.join(piece for row in get_board_rows(1) for piece in row))
+          @   @
+         /   /
+    @ - A - B
+         \ / \
+      @ - C   @
+           \
+            @
+    """
+    rows = _get_rows(board_length)
+    board = [list(' ' * (2 * board_length + 4) + '@   @'),
+             list(' ' * (2 * board_length + 3) + '/   /')]
+    for row in range(1, board_length + 1):
+        board_line = list(' ' * (2 * (board_length - row)) + '@')
+        for cell in rows[row - 1]:
+            board_line.extend(list(' - ') + [cell])
+        if row < board_length:
+            board.append(board_line + list('   @'))
+            board.append(list(' ' * (2 * (board_length - row) + 3) +
+                              '/ \\ ' * (row + 1) + '/'))
+        else:
+            board.append(board_line)
+    board.append(list(' ' * 5 + '\\ / ' * board_length + '\\'))
+    board_line = list('  @')
+    for cell in rows[-1]:
+        board_line.extend(list(' - ') + [cell])
+    board.append(board_line + list('   @'))
+    board.append(list(' ' * 7 + '\\   ' * (board_length - 1) + '\\'))
+    board.append(list(' ' * 8 + '@   ' * (board_length - 1) + '@'))
+    for board_line in board[:-1]:
+        board_line.append('\n')
+    return board
+
+
+def get_coordinates(board_length: int) -> Dict[str, Tuple[int, int, int]]:
+    """Return the coordinates of every cell of the board with side length
+    <board_length>.
+
+    The board is a triangle of side <board_length> + 2 with its corners
+    removed. A cell's coordinates (a, b, c) are its distances from the
+    three sides of that triangle, so a + b + c == board_length + 1 and
+    every ley-line is a line of cells with one coordinate in common.
+
+    >>> get_coordinates(1)
+    {'A': (0, 1, 1), 'B': (1, 0, 1), 'C': (1, 1, 0)}
+    """
+    coordinates = {}
+    cells = iter(get_cells(board_length))
+    for row in range(1, board_length + 2):
+        # The last row is missing both of its corners; the others are
+        # missing the top corner, which sits alone above the first row.
+        first, last = 0, row
+        if row == board_length + 1:
+            first, last = 1, row - 1
+        for column in range(first, last + 1):
+            coordinates[next(cells)] = (column, row - column,
+                                        board_length + 1 - row)
+    return coordinates
+
+
+def get_symmetries(board_length: int) -> List[Dict[str, str]]:
+    """Return the 6 symmetries of the board with side length <board_length>,
+    each as a dictionary mapping every cell to the cell it is moved to. The
+    first symmetry is the identity.
+
+    >>> symmetries = get_symmetries(1)
+    >>> len(symmetries)
+    6
+    >>> symmetries[0]
+    {'A': 'A', 'B': 'B', 'C': 'C'}
+    >>> sorted(''.join(sorted(symmetry, key=symmetry.get))
+    ...        for symmetry in symmetries)
+    ['ABC', 'ACB', 'BAC', 'BCA', 'CAB', 'CBA']
+    """
+    coordinates = get_coordinates(board_length)
+    cells = {point: cell for cell, point in coordinates.items()}
+    return [{cell: cells[tuple(point[i] for i in order)]
+             for cell, point in coordinates.items()}
+            for order in itertools.permutations(range(3))]
+
+
+class LeyLineIndex:
+    """
+    A static index of the ley-lines of one Stonehenge board size. There is
+    only ever one index per side length; use get_ley_line_index to get it.
+
+    === Public Attributes ===
+    names:
+           The names of the ley-lines in order ('ley_line1', ...).
+    line_ids:
+           Maps the name of each ley-line to its number.
+    cell_lines:
+           Maps each cell to a list of (name, position) pairs, one for every
+           ley-line the cell sits on. position is the index of the cell in
+           that ley-line's list, where index 0 holds the ley-line marker.
+    lengths:
+           Maps the name of each ley-line to the number of cells on it.
+    thresholds:
+           Maps the name of each ley-line to the number of cells a player
+           must capture on it to claim it (at least half of its cells).
+    template:
+           The board of a newly initialized game, where each sublist
+           contains the pieces of one row of the board (see
+           get_board_rows).
+    cell_positions:
+           Maps each cell to its (row, column) position in template.
+    marker_positions:
+           Maps the name of each ley-line to the (row, column) position of
+           its marker in template.
+    base_key, turn_key:
+           The 64-bit Zobrist keys for this board size and for p1 being the
+           current player.
+    cell_keys:
+           Maps each cell to the Zobrist keys for it being captured by
+           player '1' or '2'.
+    marker_keys:
+           Maps the name of each ley-line to the Zobrist keys for it being
+           claimed by 'p1' or 'p2'.
+    symmetries:
+           The symmetries of the board from get_symmetries.
+    line_symmetries:
+           For each of symmetries, a dictionary mapping the name of every
+           ley-line to the name of the ley-line it is moved to.
+    """
+    names: List[str]
+    line_ids: Dict[str, int]
+    cell_lines: Dict[str, List[Tuple[str, int]]]
+    lengths: Dict[str, int]
+    thresholds: Dict[str, int]
+    template: List[List[str]]
+    cell_positions: Dict[str, Tuple[int, int]]
+    marker_positions: Dict[str, Tuple[int, int]]
+    base_key: int
+    turn_key: int
+    cell_keys: Dict[str, Dict[str, int]]
+    marker_keys: Dict[str, Dict[str, int]]
+    symmetries: List[Dict[str, str]]
+    line_symmetries: List[Dict[str, str]]
+
+    def __init__(self, board_length: int) -> None:
+        """Build the index for the board with side length <board_length>.
+
+        >>> index = LeyLineIndex(1)
+        >>> index.cell_lines['A']
+        [('ley_line1', 1), ('ley_line3', 1), ('ley_line6', 2)]
+        >>> index.line_ids['ley_line6'], index.thresholds['ley_line6']
+        (6, 1)
+        >>> index.cell_positions['C'], index.marker_positions['ley_line4']
+        ((4, 6), (4, 2))
+        >>> index.symmetries[1], index.line_symmetries[1]['ley_line3']
+        ({'A': 'A', 'B': 'C', 'C': 'B'}, 'ley_line6')
+        """
+        self.names, self.line_ids = [], {}
+        self.cell_lines = {cell: [] for cell in get_cells(board_length)}
+        self.lengths, self.thresholds = {}, {}
+        for i, cells in enumerate(get_ley_lines(board_length)):
+            name = 'ley_line{}'.format(i + 1)
+            self.names.append(name)
+            self.line_ids[name] = i + 1
+            self.lengths[name] = len(cells)
+            self.thresholds[name] = (len(cells) + 1) // 2
+            for position, cell in enumerate(cells):
+                # Position 0 of every ley-line list is its marker.
+                self.cell_lines[cell].append((name, position + 1))
+
+        self.template = get_board_rows(board_length)
+        self.cell_positions, self.marker_positions = {}, {}
+        for row, board_line in enumerate(self.template):
+            for column, ch in enumerate(board_line):
+                if ch in self.cell_lines:
+                    self.cell_positions[ch] = (row, column)
+                elif ch == '@':
+                    # The markers appear in the same order as the ley-lines.
+                    name = self.names[len(self.marker_positions)]
+                    self.marker_positions[name] = (row, column)
+
+        # Seeding with the side length gives every process the same keys.
+        rng = random.Random(board_length)
+        self.base_key, self.turn_key = rng.getrandbits(64), rng.getrandbits(64)
+        self.cell_keys = {cell: {'1': rng.getrandbits(64),
+                                 '2': rng.getrandbits(64)}
+                          for cell in get_cells(board_length)}
+        self.marker_keys = {name: {'p1': rng.getrandbits(64),
+                                   'p2': rng.getrandbits(64)}
+                            for name in self.names}
+
+        # A symmetry moves the cells of a ley-line onto another ley-line.
+        lines = {frozenset(cells): 'ley_line{}'.format(i + 1)
+                 for i, cells in enumerate(get_ley_lines(board_length))}
+        self.symmetries = get_symmetries(board_length)
+        self.line_symmetries = [
+            {name: lines[frozenset(symmetry[cell] for cell in cells)]
+             for cells, name in lines.items()}
+            for symmetry in self.symmetries]
+
+
+_INDEXES = {}  # type: Dict[int, LeyLineIndex]
+
+
+def get_ley_line_index(board_length: int) -> LeyLineIndex:
+    """Return the shared LeyLineIndex for the board with side length
+    <board_length>, building it the first time it is asked for.
+
+    >>> get_ley_line_index(3) is get_ley_line_index(3)
+    True
+    """
+    if board_length not in _INDEXES:
+        _INDEXES[board_length] = LeyLineIndex(board_length)
+    return _INDEXES[board_length]
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
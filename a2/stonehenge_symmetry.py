@@ -0,0 +1,118 @@
+""" Stonehenge board symmetries
+
+=== CSC148 Winter 2018 ===
+University of Toronto
+Assignment 2
+Submitted by: Eric Koehli
+
+=== Module Description ===
+This module maps a Stonehenge game state to the canonical state of its
+symmetry class. Rotating or reflecting the board gives a state that is
+won or lost exactly like the original one, so a cache only needs to store
+one of the (up to) 6 symmetric states. The canonical state is the one
+with the smallest Zobrist key.
+
+>>> from stonehenge import StonehengeGameState
+>>> state = StonehengeGameState(True, 2)
+>>> canonical_key(state.make_move('A')) == canonical_key(state.make_move('G'))
+True
+>>> canonical_key(state.make_move('A')) == canonical_key(state.make_move('D'))
+False
+"""
+from typing import Dict, List, Tuple
+from stonehenge import StonehengeGameState
+from stonehenge_layout import get_ley_line_index, get_ley_lines
+
+
+def _symmetric_keys(state: StonehengeGameState) -> List[int]:
+    """Return the Zobrist key of every symmetric image of <state>, in the
+    order of the symmetries of its LeyLineIndex.
+    """
+    index = get_ley_line_index(state.board_length)
+    owners = {}
+    for cell, ley_lines in index.cell_lines.items():
+        ley_line, position = ley_lines[0]
+        if state.ley_lines[ley_line][position] in ('1', '2'):
+            owners[cell] = state.ley_lines[ley_line][position]
+    markers = {ley_line: state.ley_lines[ley_line][0]
+               for ley_line in index.names
+               if state.ley_lines[ley_line][0] != '@'}
+
+    keys = [state.zobrist]
+    for symmetry, line_symmetry in zip(index.symmetries[1:],
+                                       index.line_symmetries[1:]):
+        key = index.base_key
+        if state.p1_turn:
+            key ^= index.turn_key
+        for cell, owner in owners.items():
+            key ^= index.cell_keys[symmetry[cell]][owner]
+        for ley_line, marker in markers.items():
+            key ^= index.marker_keys[line_symmetry[ley_line]][marker]
+        keys.append(key)
+    return keys
+
+
+def canonical_key(state: StonehengeGameState) -> int:
+    """Return the Zobrist key of the canonical state of <state>. Two states
+    have the same canonical key exactly when one is a rotation or
+    reflection of the other (barring Zobrist collisions).
+
+    >>> from stonehenge import StonehengeGameState
+    >>> state = StonehengeGameState(True, 3).make_move('A').make_move('K')
+    >>> canonical_key(state) == canonicalize(state)[0].zobrist
+    True
+    """
+    return min(_symmetric_keys(state))
+
+
+def canonicalize(state: StonehengeGameState) -> Tuple[StonehengeGameState,
+                                                       Dict[str, str]]:
+    """Return the canonical state of <state>, along with a dictionary that
+    maps every cell of <state> to the matching cell of the canonical state.
+
+    A move in <state> is played as moves[move] in the canonical state, so a
+    move found for the canonical state is played in <state> as the cell
+    that maps to it.
+
+    >>> from stonehenge import StonehengeGameState
+    >>> state = StonehengeGameState(True, 2).make_move('E')
+    >>> canonical, moves = canonicalize(state)
+    >>> other = StonehengeGameState(True, 2).make_move('C')
+    >>> canonical == canonicalize(other)[0]
+    True
+    >>> new_state = canonical.make_move(moves['A'])
+    >>> canonicalize(new_state)[0] == canonicalize(state.make_move('A'))[0]
+    True
+    """
+    index = get_ley_line_index(state.board_length)
+    keys = _symmetric_keys(state)
+    i = keys.index(min(keys))
+    if i == 0:
+        return state, index.symmetries[0]
+
+    symmetry, line_symmetry = index.symmetries[i], index.line_symmetries[i]
+    # The image of a cell holds whatever the cell held, and the image of a
+    # ley-line has the same marker as the ley-line.
+    values, markers = {}, {}
+    for cell, ley_lines in index.cell_lines.items():
+        ley_line, position = ley_lines[0]
+        value = state.ley_lines[ley_line][position]
+        values[symmetry[cell]] = value if value in ('1', '2') else None
+    for ley_line in index.names:
+        markers[line_symmetry[ley_line]] = state.ley_lines[ley_line][0]
+
+    ley_lines = {}
+    for j, cells in enumerate(get_ley_lines(state.board_length)):
+        name = index.names[j]
+        ley_lines[name] = [markers[name]] + [values[cell] or cell
+                                             for cell in cells]
+    canonical = StonehengeGameState(state.p1_turn, ley_lines=ley_lines,
+                                    zobrist=keys[i])
+    return canonical, symmetry
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
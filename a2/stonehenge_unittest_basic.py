@@ -542,6 +542,23 @@ class StonehengeUnitTests(unittest.TestCase):
                          "After calling make_move, the current_state of a " +
                          "game should not be changed.")
 
+    @patch('builtins.input', side_effect=['7'])
+    def test_stonehenge_large_board(self, input):
+        """
+        Test that a board bigger than 5 can be played, with two-letter
+        labels for the cells after Z.
+        """
+        game = StonehengeGame(True)
+        moves = game.current_state.get_possible_moves()
+
+        self.assertEqual(len(moves), 42,
+                         "A board with side-length 7 should have 42 cells.")
+        self.assertEqual(moves[26], game.str_to_move("aa"),
+                         "The cell after Z should be AA.")
+        new_state = game.current_state.make_move(moves[26])
+        self.assertEqual(len(new_state.get_possible_moves()), 41,
+                         "Capturing AA should leave 41 possible moves.")
+
     @patch('builtins.input', side_effect=['1'])
     def test_stonehenge_is_valid_move_false(self, input):
         """
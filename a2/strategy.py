@@ -10,24 +10,45 @@ Assignment 2
 This module contains different strategies to be used for playing
 a two-player game.
 """
-from typing import Union
+import math
+import random
+import time
+import weakref
+from concurrent.futures import Executor, ProcessPoolExecutor, as_completed
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple, Union
 from stonehenge import StonehengeGame, StonehengeGameState
+from stonehenge_symmetry import canonical_key
 from subtract_square_game import SubtractSquareGame
+from subtract_square_state import SubtractSquareState
 from stack import Stack
-from wrapper import Wrapper
+from wrapper import SearchNode, MCTSNode
+from transposition import TranspositionTable
+from shared_transposition import (SharedTranspositionTable, NO_MOVE, SOLVED,
+                                  EXACT, LOWER, UPPER)
+from move_ordering import MoveOrderer
+from search_stats import SearchStats
 
 
 def interactive_strategy(
-        game: Union[StonehengeGame, SubtractSquareGame]) -> Union[str, int]:
+        game: Union[StonehengeGame, SubtractSquareGame],
+        stats: SearchStats = None) -> Union[str, int]:
     """
     Return a move for game through interactively asking the user for input.
+
+    If <stats> is given, the time taken to answer is added to it.
     """
+    if stats is not None:
+        stats.start()
     move = input("Enter a move: ")
+    if stats is not None:
+        stats.stop()
     return game.str_to_move(move)
 
 
 def rough_outcome_strategy(
-        game: Union[StonehengeGame, SubtractSquareGame]) -> Union[str, int]:
+        game: Union[StonehengeGame, SubtractSquareGame],
+        stats: SearchStats = None) -> Union[str, int]:
     """
     Return a move for game by picking a move which results in a state with
     the lowest rough_outcome() for the opponent.
@@ -46,14 +67,22 @@ def rough_outcome_strategy(
         In essence: rough_outcome() will only look 1 or 2 states ahead to
         'guess' the outcome of the game, but no further. It's better than
         random, but worse than minimax.
+
+    If <stats> is given, the search is counted in it (see search_stats).
     """
     current_state = game.current_state
     best_move = None
     best_outcome = -2  # Temporarily -- just so we can replace this easily later
+    available_moves = current_state.get_possible_moves()
+    if stats is not None:
+        stats.start()
+        stats.visit(0, len(available_moves))
 
     # Get the move that results in the lowest rough_outcome for the opponent
-    for move in current_state.get_possible_moves():
+    for move in available_moves:
         new_state = current_state.make_move(move)
+        if stats is not None:
+            stats.visit(1)
 
         # We multiply the below by -1 since a state that's bad for the opponent
         # is good for us.
@@ -62,16 +91,30 @@ def rough_outcome_strategy(
             best_outcome = guessed_score
             best_move = move
 
+    if stats is not None:
+        stats.stop()
     # Return the move that resulted in the best rough_outcome
     return best_move
 
 
 def recursive_minimax_strategy(
-        game: Union[StonehengeGame, SubtractSquareGame]) -> Union[str, int]:
+        game: Union[StonehengeGame, SubtractSquareGame],
+        table: TranspositionTable = None,
+        stats: SearchStats = None) -> Union[str, int]:
     r"""
     Return a move for <game> by picking a move that will lead to a win,
     if possible.
 
+    The score of every state that gets solved is stored in <table> (a new
+    TranspositionTable if none is given), so a state that is reached
+    again through a different order of moves isn't searched again. Pass
+    the same table between calls to keep the solved states around, or a
+    persistent_cache.PersistentCache to keep them between runs too. A
+    Stonehenge state is stored under the key of its canonical state, so
+    rotations and reflections of a solved state aren't searched either.
+
+    If <stats> is given, the search is counted in it (see search_stats).
+
     Idea: Each move will make a new game state that will have a longest path
     and a shortest path. These are the cases where we have reached a leaf,
     (i.e. we've reached a game state where the game is over). Most of the
@@ -144,49 +187,102 @@ def recursive_minimax_strategy(
            \   \
             @   @
     >>> recursive_minimax_strategy(sh3)
-    'F'
+    'G'
+    >>> table = TranspositionTable()
+    >>> recursive_minimax_strategy(sh3, table)
+    'G'
+    >>> table.hits > 0
+    True
+    >>> stats = SearchStats()
+    >>> recursive_minimax_strategy(sh3, TranspositionTable(), stats)
+    'G'
+    >>> stats.nodes > 0, stats.max_depth, stats.cache_hits > 0
+    (True, 5, True)
     """
+    if table is None:
+        table = TranspositionTable()
     current_state = game.current_state
     available_moves = current_state.get_possible_moves()
+    if stats is not None:
+        stats.start()
+        stats.visit(0, len(available_moves))
 
     best_move = None
     for move in available_moves:
         new_state = current_state.make_move(move)
         game.current_state = new_state
 
-        score = _recursive_is_winner(game)
+        score = _recursive_is_winner(game, table, stats)
         if score == 1:
             best_move = move
 
     # reset our game's current_state attr
     game.current_state = current_state
+    if stats is not None:
+        stats.stop()
     if best_move is not None:
         return best_move
     # if all else fails -> no hope of winning is left :(
     return available_moves[0]
 
 
-def _recursive_is_winner(
-        game: Union[StonehengeGame, SubtractSquareGame]) -> int:
-    """ Return
+def _recursive_is_winner(game: Union[StonehengeGame, SubtractSquareGame],
+                         table: TranspositionTable,
+                         stats: SearchStats = None, ply: int = 1) -> int:
+    """ Return 1 if the player who made the last move can force a win
+    from game.current_state, and -1 otherwise. <ply> is the number of moves
+    made since the root of the search.
+
+    Scores are looked up in and stored in <table>, and the search is
+    counted in <stats> if it is given.
     """
     state = game.current_state
+    key = _table_key(state)
+    score = table.get(key)
+    if stats is not None:
+        stats.lookup(score is not None)
+    if score is not None:
+        if stats is not None:
+            stats.visit(ply)
+        return score
+
     actual_player, other_player = 'p1', 'p2'
     if actual_player == state.get_current_player_name():
         actual_player, other_player = 'p2', 'p1'
 
     if game.is_winner(actual_player):
-        return 1
+        score = 1
+        if stats is not None:
+            stats.visit(ply, 0)
     elif game.is_winner(other_player):
-        return -1
+        score = -1
+        if stats is not None:
+            stats.visit(ply, 0)
     else:
         scores = []
-        for move in state.get_possible_moves():
+        available_moves = state.get_possible_moves()
+        if stats is not None:
+            stats.visit(ply, len(available_moves))
+        for move in available_moves:
             new_state = state.make_move(move)
             game.current_state = new_state
-            score = _recursive_is_winner(game)
-            scores.append(score)
-    return max(scores)
+            scores.append(_recursive_is_winner(game, table, stats, ply + 1))
+        # The scores are for the player who moves next, so the best one
+        # for them is the worst one for the player who just moved.
+        score = -max(scores)
+    table.put(key, score)
+    return score
+
+
+def _table_key(state: Union[StonehengeGameState, SubtractSquareState]) -> int:
+    """ Return the key <state> is stored under in a TranspositionTable.
+
+    Symmetric Stonehenge states are won or lost alike, so they share the
+    key of their canonical state.
+    """
+    if isinstance(state, StonehengeGameState):
+        return canonical_key(state)
+    return hash(state)
 
 
 def _recursive_height_max(
@@ -294,11 +390,14 @@ def _recursive_height_min(
 
 
 def iterative_minimax_strategy(
-        game: Union[StonehengeGame, SubtractSquareGame]) -> Union[str, int]:
+        game: Union[StonehengeGame, SubtractSquareGame],
+        stats: SearchStats = None) -> Union[str, int]:
     r"""
     Return a move for <game> by picking a move that will lead to a win,
     if possible.
 
+    If <stats> is given, the search is counted in it (see search_stats).
+
     >>> sh = StonehengeGame(True, 2)
     >>> gs = StonehengeGameState(board_length=2)
     >>> gs2 = gs.make_move('D')
@@ -336,44 +435,65 @@ def iterative_minimax_strategy(
             2   1
     >>> iterative_minimax_strategy(sh2)
     'E'
+    >>> stats = SearchStats()
+    >>> iterative_minimax_strategy(sh2, stats)
+    'E'
+    >>> stats.max_depth, stats.peak_frontier > stats.max_depth
+    (4, True)
     """
     current_state = game.current_state
-    state = Wrapper(current_state)
+    # Every node that is alive in the search is in this flat list. Since
+    # the search is depth-first, every node after a node's children is one
+    # of its descendants, so once a node is scored the end of the list from
+    # its first child on can be thrown away.
+    nodes = [SearchNode(current_state)]
     stk = Stack()
-    stk.push(state)
+    stk.push(0)
+    # plies[i] is the number of moves from the root to nodes[i], and is
+    # only kept when the search is counted.
+    plies = [0]
+    if stats is not None:
+        stats.start()
 
     # Here we go:
     while not stk.is_empty():
-        state = stk.pop()
-        # Update the game's current_state attr to use is_over method
-        game.current_state = state.state
+        i = stk.pop()
+        node = nodes[i]
 
-        if game.is_over(state.state):
-            # remember state is wrapped in a 'Wrapper' object.
-            state.score = -1
+        if node.first_child is None and game.is_over(node.state):
+            node.score, node.state = -1, None
+            if stats is not None:
+                stats.visit(plies[i], 0)
 
-        elif state.children == []:
+        elif node.first_child is None:
             # Then we haven't looked at this state yet.
-            # Wrap the new state with the move that made that state.
-            for move in state.state.get_possible_moves():
-                new_state = state.state.make_move(move)
-                wrap = Wrapper(new_state, move=move)
-                state.children.append(wrap)
+            # Each child remembers the move that made its state.
+            node.first_child = len(nodes)
+            for move in node.state.get_possible_moves():
+                nodes.append(SearchNode(node.state.make_move(move), move))
+            node.end_child, node.state = len(nodes), None
+            if stats is not None:
+                num_children = node.end_child - node.first_child
+                stats.visit(plies[i], num_children)
+                plies.extend([plies[i] + 1] * num_children)
 
-            stk.push(state)
-            for child in state.children:
-                stk.push(child)
+            stk.push(i)
+            for j in range(node.first_child, node.end_child):
+                stk.push(j)
 
-        # Build a helper for this else block for dumb pyta
         else:
-            # Then we've already looked at this state. So it should
-            # have a list of children
-            _iterative_update_score(state)
+            # Then we've already looked at this state, and every one of
+            # its children has a score.
+            _iterative_update_score(node, nodes)
+            if i != 0:
+                # Keep the root's children so we can pick a move.
+                del nodes[node.first_child:]
+                del plies[node.first_child:]
 
-    # reset the game's current_state attr back to before mutation.
-    game.current_state = current_state
-    # After the while loop, there should be a wrapper that has children...
-    for child in state.children:
+    if stats is not None:
+        stats.stop()
+    # After the while loop, the root's children are still in nodes...
+    for child in nodes[nodes[0].first_child:nodes[0].end_child]:
         if child.score == -1:
             return child.move
 
@@ -382,19 +502,925 @@ def iterative_minimax_strategy(
     return available_moves[0]
 
 
-def _iterative_update_score(state: Wrapper) -> None:
-    """ Update the score of <state>
-
+def _iterative_update_score(node: SearchNode, nodes: List[SearchNode]) -> None:
+    """ Update the score of <node>, whose children in <nodes> have all been
+    scored.
     """
-    # curr_player, opponent = 'p1', 'p2'
-    # if curr_player != curr_state.get_current_player_name():
-    #     curr_player, opponent = 'p2', 'p1'
     best_score = -2
-    for child in state.children:
+    for child in nodes[node.first_child:node.end_child]:
         other_score = child.score * -1
         if other_score >= best_score:
             best_score = other_score
-    state.score = best_score
+    node.score = best_score
+
+
+def _can_undo(state: Any) -> bool:
+    """ Return whether <state> supports apply and undo, which lets a search
+    move through the game tree without creating a new state for every node.
+
+    The searches in this module only apply moves to states they created
+    with make_move themselves, never to game.current_state.
+    """
+    return isinstance(state, (StonehengeGameState, SubtractSquareState))
+
+
+def alphabeta_strategy(
+        game: Union[StonehengeGame, SubtractSquareGame],
+        orderer: MoveOrderer = None,
+        stats: SearchStats = None,
+        table: TranspositionTable = None) -> Union[str, int]:
+    r"""
+    Return a move for <game> by picking a move that will lead to a win,
+    if possible.
+
+    This is minimax written as negamax (a score for one player is the
+    negated score for the other) with alpha-beta pruning: once a move is
+    known to be worse than one already found, its remaining replies are
+    skipped. A winning move is returned as soon as it is found.
+
+    Moves are searched in the order given by <orderer> (a new MoveOrderer
+    if none is given), so the moves most likely to cause a cutoff are
+    tried first. If <stats> is given, the search is counted in it (see
+    search_stats). If <table> is given (a TranspositionTable, or a
+    SharedTranspositionTable to share it with other processes), the score
+    of every state solved is stored in it and states already in it aren't
+    searched again.
+
+    >>> sh = StonehengeGame(True, 2)
+    >>> gs = StonehengeGameState(board_length=2)
+    >>> sh.current_state = gs.make_move('D').make_move('F').make_move('A')
+    >>> alphabeta_strategy(sh)
+    'E'
+    >>> sh.current_state = gs.make_move('A').make_move('F').make_move('D')
+    >>> alphabeta_strategy(sh)
+    'E'
+    """
+    return alphabeta_solve(game, game.current_state, orderer, stats,
+                           table)[0]
+
+
+def alphabeta_solve(game: Union[StonehengeGame, SubtractSquareGame],
+                    state: Union[StonehengeGameState, SubtractSquareState],
+                    orderer: MoveOrderer = None,
+                    stats: SearchStats = None,
+                    table: TranspositionTable = None) -> Tuple[Union[str,
+                                                                     int],
+                                                               int]:
+    """ Return the best move from <state> in <game> along with the score
+    of <state> for its current player (WIN or LOSE), found with the same
+    search as alphabeta_strategy.
+
+    <state> isn't changed, and doesn't have to be game.current_state.
+
+    >>> sh = StonehengeGame(True, 2)
+    >>> gs = StonehengeGameState(board_length=2)
+    >>> stats = SearchStats()
+    >>> alphabeta_solve(sh, gs.make_move('D').make_move('F').make_move('A'),
+    ...                 stats=stats)
+    ('E', 1)
+    >>> stats.terminal_nodes > 0, stats.elapsed > 0
+    (True, True)
+    """
+    if orderer is None:
+        orderer = MoveOrderer()
+    available_moves = orderer.order(state, state.get_possible_moves())
+    if stats is not None:
+        stats.start()
+        stats.visit(0, len(available_moves))
+
+    best_move, best_score = available_moves[0], state.LOSE
+    alpha, beta = state.LOSE, state.WIN
+    for i, move in enumerate(available_moves):
+        score = -_negamax(game, state.make_move(move), -beta, -alpha,
+                          orderer, 1, len(available_moves) - 1, stats, table)
+        if score == state.WIN:
+            if stats is not None:
+                stats.prune(len(available_moves) - i - 1)
+                stats.stop()
+            return move, score
+        if score > best_score:
+            best_move, best_score = move, score
+            alpha = score
+    if stats is not None:
+        stats.stop()
+    return best_move, best_score
+
+
+def _negamax(game: Union[StonehengeGame, SubtractSquareGame],
+             state: Union[StonehengeGameState, SubtractSquareState],
+             alpha: int, beta: int, orderer: MoveOrderer, ply: int,
+             depth: int, stats: SearchStats = None,
+             table: TranspositionTable = None) -> int:
+    """ Return the score of <state> for its current player, searching only
+    the scores strictly between <alpha> and <beta>. <ply> is the number of
+    moves made since the root of the search, and <depth> is about how many
+    moves are left to search below <state>: the number of moves from the
+    root minus <ply>, which is exact for Stonehenge since every move takes
+    a cell. Cutoffs are recorded in <orderer> with it, so a cutoff that
+    saves a bigger subtree counts for more.
+
+    A score at or below alpha means the current player has a better choice
+    earlier in the game, and a score at or above beta means the opponent
+    does, so the search stops at the first move that reaches beta.
+
+    The search is counted in <stats> if it is given, and scores are looked
+    up in and stored in <table> if it is given. A game can only be won or
+    lost, so the window is always (LOSE, WIN) and every score returned is
+    exact, which is what makes it safe to store. Like _recursive_is_winner,
+    the table holds the score for the player who made the last move, so
+    the two searches can share a table.
+    """
+    if table is not None:
+        key = _table_key(state)
+        score = table.get(key)
+        if stats is not None:
+            stats.lookup(score is not None)
+        if score is not None:
+            if stats is not None:
+                stats.visit(ply)
+            return -score
+
+    if game.is_over(state):
+        if stats is not None:
+            stats.visit(ply, 0)
+        # The player who just moved won, so the current player lost.
+        return state.LOSE
+
+    moves = orderer.order(state, state.get_possible_moves(), ply)
+    if stats is not None:
+        stats.visit(ply, len(moves))
+    best_score = state.LOSE
+    for move in moves:
+        if _can_undo(state):
+            state.apply(move)
+            try:
+                score = -_negamax(game, state, -beta, -alpha, orderer,
+                                  ply + 1, depth - 1, stats, table)
+            finally:
+                state.undo()
+        else:
+            score = -_negamax(game, state.make_move(move), -beta, -alpha,
+                              orderer, ply + 1, depth - 1, stats, table)
+        if score > best_score:
+            best_score = score
+            if score > alpha:
+                alpha = score
+            if alpha >= beta:
+                orderer.record_cutoff(move, ply, max(depth, 1))
+                if stats is not None:
+                    stats.prune(len(moves) - moves.index(move) - 1)
+                break
+    if table is not None:
+        table.put(key, -best_score)
+    return best_score
+
+
+def timed_strategy(game: Union[StonehengeGame, SubtractSquareGame],
+                   budget_ms: int = 1000, info: Dict[str, Any] = None,
+                   evaluator: Callable[[Any], float] = None,
+                   stats: SearchStats = None,
+                   table: SharedTranspositionTable = None) -> Union[str,
+                                                                    int]:
+    r"""
+    Return a move for <game>, spending at most about <budget_ms>
+    milliseconds searching for it.
+
+    This is iterative deepening: alpha-beta is run to a depth of 1 move,
+    then 2 moves, and so on until the time runs out. States at the depth
+    limit are scored with <evaluator> if it is given (e.g. the evaluate
+    method of an evaluation.Evaluator), and with rough_outcome() if it
+    isn't. An evaluator must only return WIN or LOSE when the outcome is
+    certain. The move from the deepest search that finished is returned,
+    so there is always a move ready, and the search stops early once the
+    whole game tree has been searched or the outcome is certain.
+
+    If <table> is given, the score, depth and best move of every state
+    searched are stored in it. A stored score is used instead of searching
+    a state again when it was searched at least as deep as it is needed,
+    and the stored best move is searched first otherwise, so each pass
+    (and the next move's search, if the table is kept) starts from what
+    the last one found.
+
+    If <info> is given, info['depth'] is set to the deepest search that
+    finished. If <stats> is given, every pass of the search is counted in
+    it (see search_stats).
+
+    >>> sh = StonehengeGame(True, 2)
+    >>> gs = StonehengeGameState(board_length=2)
+    >>> sh.current_state = gs.make_move('A').make_move('F').make_move('D')
+    >>> info = {}
+    >>> timed_strategy(sh, 1000, info)
+    'E'
+    >>> info['depth'] > 0
+    True
+    >>> stats = SearchStats()
+    >>> timed_strategy(sh, 1000, stats=stats)
+    'E'
+    >>> stats.evaluated_nodes > 0, stats.max_depth > 0
+    (True, True)
+    >>> from evaluation import Evaluator
+    >>> timed_strategy(sh, 1000, evaluator=Evaluator().evaluate)
+    'E'
+    >>> sh = StonehengeGame(True, 5)
+    >>> timed_strategy(sh, 50) in sh.current_state.get_possible_moves()
+    True
+    >>> with SharedTranspositionTable() as table:
+    ...     move = timed_strategy(sh, 50, table=table)
+    ...     move in sh.current_state.get_possible_moves(), len(table) > 0
+    (True, True)
+    """
+    if stats is not None:
+        stats.start()
+    search = _DeadlineSearch(game, time.perf_counter() + budget_ms / 1000,
+                             evaluator, stats, table)
+    current_state = game.current_state
+    entry = None if table is None else table.get_entry(hash(current_state))
+    moves = search.order(current_state, current_state.get_possible_moves(),
+                         0, entry)
+    best_move, depth = moves[0], 0
+    try:
+        while True:
+            search.horizon_reached = False
+            move, score = search.search_root(current_state, moves, depth + 1)
+            best_move, depth = move, depth + 1
+            # Search the best move first on the next, deeper, pass.
+            moves.remove(move)
+            moves.insert(0, move)
+            if (not search.horizon_reached or
+                    score in (current_state.WIN, current_state.LOSE)):
+                break
+    except _SearchTimeout:
+        pass
+
+    if info is not None:
+        info['depth'] = depth
+    if stats is not None:
+        stats.stop()
+    return best_move
+
+
+class _SearchTimeout(Exception):
+    """Exception raised when a _DeadlineSearch runs out of time."""
+    pass
+
+
+class _DeadlineSearch:
+    """A depth-limited alpha-beta search that stops at a deadline.
+
+    === Attributes ===
+    game: The game being searched.
+    deadline: The time.perf_counter() value at which to stop.
+    orderer: The move orderer shared by every pass of the search.
+    evaluator: The function that scores states at the depth limit, or None
+               to use rough_outcome.
+    horizon_reached: Whether a pass stopped at its depth limit before the
+                     game was over.
+    stats: The statistics the search is counted in, or None.
+    table: The table the entries of the states searched are stored in, or
+           None.
+    """
+    game: Union[StonehengeGame, SubtractSquareGame]
+    deadline: float
+    orderer: MoveOrderer
+    evaluator: Union[Callable[[Any], float], None]
+    horizon_reached: bool
+    stats: Union[SearchStats, None]
+    table: Union[SharedTranspositionTable, None]
+
+    def __init__(self, game: Union[StonehengeGame, SubtractSquareGame],
+                 deadline: float,
+                 evaluator: Callable[[Any], float] = None,
+                 stats: SearchStats = None,
+                 table: SharedTranspositionTable = None) -> None:
+        """Initialize a new search of <game> that stops at <deadline> and
+        scores the states at its depth limit with <evaluator>, counting
+        the search in <stats> and storing it in <table> if they are given.
+        """
+        self.game, self.deadline = game, deadline
+        self.evaluator, self.stats, self.table = evaluator, stats, table
+        self.orderer = MoveOrderer()
+        self.horizon_reached = False
+
+    def order(self, state: Union[StonehengeGameState, SubtractSquareState],
+              possible: list, ply: int,
+              entry: Optional[Tuple[float, int, int, str]]) -> list:
+        """Return <possible>, the possible moves from <state>, in the
+        order to search them: the best move stored in the table <entry>
+        for <state> first, if there is one, and then in the orderer's
+        order.
+        """
+        moves = self.orderer.order(state, possible, ply)
+        if entry is not None and entry[2] < len(possible):
+            moves.remove(possible[entry[2]])
+            moves.insert(0, possible[entry[2]])
+        return moves
+
+    def search_root(self, state: Union[StonehengeGameState,
+                                       SubtractSquareState],
+                    moves: list, depth: int) -> Tuple[Union[str, int], float]:
+        """Return the best of <moves> from <state> and its score, searching
+        <depth> moves ahead.
+
+        Raise a _SearchTimeout if the deadline passes first.
+        """
+        best_move, best_score = moves[0], state.LOSE - 1
+        alpha, beta = state.LOSE, state.WIN
+        if self.stats is not None:
+            self.stats.visit(0, len(moves))
+        for i, move in enumerate(moves):
+            score = -self.search(state.make_move(move), depth - 1,
+                                 -beta, -alpha, 1)
+            if score > best_score:
+                best_move, best_score = move, score
+                alpha = max(alpha, score)
+                if score >= beta:
+                    if self.stats is not None:
+                        self.stats.prune(len(moves) - i - 1)
+                    break
+        return best_move, best_score
+
+    def search(self, state: Union[StonehengeGameState, SubtractSquareState],
+               depth: int, alpha: float, beta: float, ply: int) -> float:
+        """Return the score of <state> for its current player, searching
+        <depth> moves ahead and only the scores between <alpha> and <beta>.
+
+        Raise a _SearchTimeout if the deadline passes first.
+        """
+        if time.perf_counter() > self.deadline:
+            raise _SearchTimeout
+        if self.game.is_over(state):
+            if self.stats is not None:
+                self.stats.visit(ply, 0)
+            return state.LOSE
+        if depth == 0:
+            self.horizon_reached = True
+            if self.stats is not None:
+                self.stats.visit(ply)
+            if self.evaluator is None:
+                return state.rough_outcome()
+            return self.evaluator(state)
+
+        entry = None
+        if self.table is not None:
+            key = hash(state)
+            entry = self.table.get_entry(key)
+            if self.stats is not None:
+                self.stats.lookup(entry is not None)
+            score = self._stored_score(entry, depth, alpha, beta)
+            if score is not None:
+                if self.stats is not None:
+                    self.stats.visit(ply)
+                if entry[1] != SOLVED:
+                    self.horizon_reached = True
+                return score
+
+        possible = state.get_possible_moves()
+        moves = self.order(state, possible, ply, entry)
+        if self.stats is not None:
+            self.stats.visit(ply, len(moves))
+        best_move, best_score, original_alpha = None, state.LOSE, alpha
+        # Find out whether the search below this state reaches the depth
+        # limit anywhere; if it doesn't, the score is solved.
+        horizon_reached, self.horizon_reached = self.horizon_reached, False
+        for move in moves:
+            if _can_undo(state):
+                state.apply(move)
+                try:
+                    score = -self.search(state, depth - 1, -beta, -alpha,
+                                         ply + 1)
+                finally:
+                    state.undo()
+            else:
+                score = -self.search(state.make_move(move), depth - 1,
+                                     -beta, -alpha, ply + 1)
+            if score > best_score:
+                best_move, best_score = move, score
+                alpha = max(alpha, score)
+                if alpha >= beta:
+                    self.orderer.record_cutoff(move, ply, depth)
+                    if self.stats is not None:
+                        self.stats.prune(len(moves) - moves.index(move) - 1)
+                    break
+        if self.table is not None:
+            self._store(key, possible, best_move, best_score,
+                        depth if self.horizon_reached else SOLVED,
+                        original_alpha, beta)
+        self.horizon_reached = self.horizon_reached or horizon_reached
+        return best_score
+
+    @staticmethod
+    def _stored_score(entry: Optional[Tuple[float, int, int, str]],
+                      depth: int, alpha: float,
+                      beta: float) -> Optional[float]:
+        """Return the score for the current player that the table <entry>
+        settles for a state searched <depth> moves ahead with the window
+        <alpha> to <beta>, or None if the state has to be searched.
+
+        Like the other searches, the table holds values for the player who
+        made the last move, so a LOWER bound on the value is an upper bound
+        on the score and the other way around.
+        """
+        if entry is None or entry[1] < depth:
+            return None
+        score, bound = -entry[0], entry[3]
+        if (bound == EXACT or (bound == LOWER and score <= alpha) or
+                (bound == UPPER and score >= beta)):
+            return score
+        return None
+
+    def _store(self, key: int, possible: list, best_move: Any,
+               best_score: float, depth: int, alpha: float,
+               beta: float) -> None:
+        """Store <best_score> and <best_move> for the state with <key>,
+        which has the moves <possible>, searched <depth> moves ahead (or
+        SOLVED if the search never reached its depth limit) with the window
+        <alpha> to <beta>.
+        """
+        move_index = NO_MOVE
+        if best_move is not None and possible.index(best_move) < NO_MOVE:
+            move_index = possible.index(best_move)
+        # A score at or above beta is only a lower bound on the score, and
+        # one at or below alpha only an upper bound. The value stored is
+        # the negated score, so the bounds swap.
+        bound = EXACT
+        if best_score >= beta:
+            bound = UPPER
+        elif best_score <= alpha:
+            bound = LOWER
+        self.table.put(key, -best_score, depth, move_index, bound)
+
+
+def parallel_minimax_strategy(
+        game: Union[StonehengeGame, SubtractSquareGame],
+        workers: int = None, split_depth: int = 1,
+        executor: Executor = None,
+        stats: SearchStats = None,
+        table: SharedTranspositionTable = None) -> Union[str, int]:
+    r"""
+    Return a move for <game> by picking a move that will lead to a win,
+    if possible, solving the moves in parallel over a process pool.
+
+    With a <split_depth> of 1, the state after each move is solved by a
+    separate task. With a <split_depth> of 2, each reply to each move is a
+    separate task instead, which gives more tasks than there are workers
+    when there are only a few moves. Every task is solved with alpha-beta
+    in a worker process; game.current_state is never changed. A move that
+    ends the game is returned before any task is started, and as soon as
+    a winning move is found, the remaining tasks are cancelled and the
+    ones already running are told to stop.
+
+    The tasks run in <executor> if one is given (so a pool can be reused
+    between moves), and otherwise in a new ProcessPoolExecutor with
+    <workers> processes.
+
+    If <table> is given, every worker stores the states it solves in it
+    and looks them up there first, so a state solved by one worker isn't
+    solved again by another (or on a later move, if the table is kept).
+
+    If <stats> is given, the search is counted in it (see search_stats),
+    including the searches in the worker processes that finished.
+
+    >>> sh = StonehengeGame(True, 2)
+    >>> gs = StonehengeGameState(board_length=2)
+    >>> sh.current_state = gs.make_move('A').make_move('F').make_move('D')
+    >>> parallel_minimax_strategy(sh, workers=2)
+    'E'
+    >>> stats = SearchStats()
+    >>> parallel_minimax_strategy(sh, workers=2, split_depth=2, stats=stats)
+    'E'
+    >>> stats.max_depth > 2
+    True
+    >>> with SharedTranspositionTable() as table:
+    ...     parallel_minimax_strategy(sh, workers=2, table=table)
+    ...     len(table) > 0
+    'E'
+    True
+    >>> sh.current_state = gs.make_move('A').make_move('B')
+    >>> pool = ProcessPoolExecutor(1)
+    >>> pool.shutdown()
+    >>> parallel_minimax_strategy(sh, split_depth=2, executor=pool)
+    'G'
+    """
+    current_state = game.current_state
+    available_moves = current_state.get_possible_moves()
+    counted = stats is not None
+    if counted:
+        stats.start()
+        stats.visit(0, len(available_moves))
+    new_states = {move: current_state.make_move(move)
+                  for move in available_moves}
+    # A move that ends the game wins it, and needs no tasks.
+    for move in available_moves:
+        if game.is_over(new_states[move]):
+            if counted:
+                stats.visit(1, 0)
+                stats.stop()
+            return move
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor(workers)
+    stopping = _StopFlag()
+    # scores[move] is the lowest score for the current player found so far
+    # among the tasks for move, and remaining[move] is how many of them
+    # haven't finished.
+    scores, remaining, tasks = {}, {}, {}
+    for move in available_moves:
+        new_state = new_states[move]
+        scores[move], remaining[move] = current_state.WIN, 0
+        if split_depth < 2:
+            tasks[executor.submit(_solve_state, game, new_state,
+                                  counted, table, stopping)] = (move, True)
+            remaining[move] += 1
+        else:
+            replies = new_state.get_possible_moves()
+            if counted:
+                stats.visit(1, len(replies))
+            for reply in replies:
+                task = executor.submit(_solve_state, game,
+                                       new_state.make_move(reply), counted,
+                                       table, stopping)
+                tasks[task] = (move, False)
+                remaining[move] += 1
+
+    try:
+        for task in as_completed(tasks):
+            move, is_opponent = tasks[task]
+            score, task_stats = task.result()
+            if is_opponent:
+                score = -score
+            if counted:
+                stats.merge(task_stats, 1 if is_opponent else 2)
+            scores[move] = min(scores[move], score)
+            remaining[move] -= 1
+            if remaining[move] == 0 and scores[move] == current_state.WIN:
+                break
+    finally:
+        # Tell the tasks that are already running to stop too, so they
+        # don't keep the workers busy.
+        stopping.set()
+        for task in tasks:
+            task.cancel()
+        if own_executor:
+            executor.shutdown(wait=True, cancel_futures=True)
+        stopping.close()
+        if counted:
+            stats.stop()
+
+    # A move whose tasks have all finished with a win is a winning move.
+    for move in available_moves:
+        if remaining[move] == 0 and scores[move] == current_state.WIN:
+            return move
+    return max(available_moves, key=lambda m: scores[m])
+
+
+def _solve_state(game: Union[StonehengeGame, SubtractSquareGame],
+                 state: Union[StonehengeGameState, SubtractSquareState],
+                 counted: bool = False,
+                 table: SharedTranspositionTable = None,
+                 stopping: '_StopFlag' = None) -> Tuple[
+                     Optional[int], Union[SearchStats, None]]:
+    """ Return the score of <state> for its current player, and the
+    statistics of the search if it is <counted> (and None otherwise).
+    Scores are looked up in and stored in <table> if it is given, and
+    otherwise in a table of the task's own.
+
+    If <stopping> is given, the search stops at the next state it reaches
+    once <stopping> is set, and the score returned is None.
+
+    This is the task run by each worker of parallel_minimax_strategy, so
+    it only depends on its (picklable) arguments.
+    """
+    stats = SearchStats() if counted else None
+    if table is None:
+        table = TranspositionTable()
+    if stopping is not None:
+        table = _StoppableTable(table, stopping)
+    try:
+        score = _negamax(game, state, state.LOSE, state.WIN, MoveOrderer(),
+                         0, len(state.get_possible_moves()), stats, table)
+    except _SearchStopped:
+        score = None
+    return score, stats
+
+
+class _SearchStopped(Exception):
+    """Exception raised when a search is told to stop."""
+    pass
+
+
+class _StoppableTable:
+    """A table that passes lookups on to another table until it is told to
+    stop, after which every lookup raises a _SearchStopped.
+
+    The searches look up every state they reach, so this stops a search
+    at its next state.
+
+    === Attributes ===
+    table: The table that lookups are passed on to.
+    stopping: Anything with an is_set method (such as a threading.Event or
+              a _StopFlag) that returns True once the search should stop.
+    """
+    table: Any
+    stopping: Any
+
+    def __init__(self, table: Any, stopping: Any) -> None:
+        """Initialize a new table that passes lookups on to <table> until
+        <stopping> is set.
+        """
+        self.table, self.stopping = table, stopping
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the value stored for <key> in the table, or None if there
+        isn't one.
+
+        Raise a _SearchStopped if the search should stop.
+        """
+        if self.stopping.is_set():
+            raise _SearchStopped
+        return self.table.get(key)
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store <value> for <key> in the table.
+        """
+        self.table.put(key, value)
+
+
+class _StopFlag:
+    """A flag in shared memory that tells the tasks of a parallel search to
+    stop, in whichever processes they run.
+
+    A flag sent to another process is attached to by name. Only the
+    process that made the flag can set it, and it frees the memory when it
+    closes the flag; a flag whose memory is gone by the time a task gets
+    it reads as set.
+    """
+    # === Private Attributes ===
+    # _memory:
+    #     The one-byte shared memory block holding the flag, or None if it
+    #     has been freed.
+    # _owner:
+    #     Whether this process made the flag.
+    _memory: Optional[shared_memory.SharedMemory]
+    _owner: bool
+
+    def __init__(self, name: str = None) -> None:
+        """Initialize a new flag that isn't set, or attach to the existing
+        flag called <name> if it is given.
+        """
+        self._owner = name is None
+        if self._owner:
+            self._memory = shared_memory.SharedMemory(create=True, size=1)
+            self._memory.buf[0] = 0
+        else:
+            try:
+                self._memory = shared_memory.SharedMemory(name)
+            except FileNotFoundError:
+                self._memory = None
+
+    def __getstate__(self) -> Optional[str]:
+        """Return what is sent to another process for this flag: its name.
+        """
+        return None if self._memory is None else self._memory.name
+
+    def __setstate__(self, name: Optional[str]) -> None:
+        """Attach to the flag called <name> from __getstate__.
+        """
+        if name is None:
+            self._owner, self._memory = False, None
+        else:
+            self.__init__(name)
+
+    def set(self) -> None:
+        """Set this flag.
+        """
+        if self._memory is not None:
+            self._memory.buf[0] = 1
+
+    def is_set(self) -> bool:
+        """Return whether this flag has been set.
+
+        >>> flag = _StopFlag()
+        >>> flag.is_set()
+        False
+        >>> flag.set()
+        >>> flag.is_set()
+        True
+        >>> flag.close()
+        >>> flag.is_set()
+        True
+        """
+        return self._memory is None or self._memory.buf[0] == 1
+
+    def close(self) -> None:
+        """Detach this process from the flag, and free its memory if this
+        process made it. The flag reads as set afterwards.
+        """
+        if self._memory is not None:
+            self._memory.close()
+            if self._owner:
+                self._memory.unlink()
+            self._memory = None
+
+
+def mcts_strategy(game: Union[StonehengeGame, SubtractSquareGame],
+                  iterations: int = 1000, budget_ms: int = None,
+                  rollouts: int = 4, seed: int = None,
+                  tree: 'MCTSTree' = None,
+                  stats: SearchStats = None) -> Union[str, int]:
+    r"""
+    Return a move for <game> picked by Monte Carlo tree search (UCT).
+
+    Each iteration walks down the search tree by picking the child with
+    the best upper confidence bound, adds one new child to it and plays a
+    batch of <rollouts> random games from the new child. The results are
+    counted in every node on the way back up. The search stops after
+    <iterations> iterations, or after <budget_ms> milliseconds if that is
+    given, and the most visited move is returned.
+
+    Each game keeps its own MCTSTree between calls (made with <seed> the
+    first time), so the part of the tree under the moves that were
+    actually played is reused for the next move. Pass <tree> to keep the
+    tree yourself instead. With an iteration budget, a tree made with a
+    seed always picks the same moves.
+
+    If <stats> is given, the nodes added to the tree are counted in it
+    (see search_stats); the moves of the random games aren't.
+
+    >>> sh = StonehengeGame(True, 2)
+    >>> gs = StonehengeGameState(board_length=2)
+    >>> sh.current_state = gs.make_move('D').make_move('F').make_move('A')
+    >>> mcts_strategy(sh, 300, seed=0)
+    'E'
+    >>> tree = MCTSTree(seed=1)
+    >>> sh = StonehengeGame(True, 3)
+    >>> mcts_strategy(sh, 200, tree=tree) == mcts_strategy(
+    ...     sh, 200, tree=MCTSTree(seed=1))
+    True
+    """
+    if tree is None:
+        if game not in _MCTS_TREES:
+            _MCTS_TREES[game] = MCTSTree(seed)
+        tree = _MCTS_TREES[game]
+    return tree.search(game, iterations, budget_ms, rollouts, stats)
+
+
+class MCTSTree:
+    """A Monte Carlo search tree that is kept between the moves of a game.
+
+    === Attributes ===
+    root: The node of the state that was searched last, or None if
+          nothing has been searched yet.
+    exploration: How much the upper confidence bound favours the children
+                 that have been visited the least.
+    rng: The random number generator for the random games.
+    """
+    root: Union[MCTSNode, None]
+    exploration: float
+    rng: random.Random
+
+    def __init__(self, seed: int = None, exploration: float = 1.4) -> None:
+        """Initialize a new empty tree whose random games are seeded with
+        <seed>.
+        """
+        self.root, self.exploration = None, exploration
+        self.rng = random.Random(seed)
+
+    def search(self, game: Union[StonehengeGame, SubtractSquareGame],
+               iterations: int, budget_ms: int = None,
+               rollouts: int = 4,
+               stats: SearchStats = None) -> Union[str, int]:
+        """Return the most visited move from game.current_state after
+        searching for <iterations> iterations, or for <budget_ms>
+        milliseconds if that is given, counting the nodes added to the
+        tree in <stats> if it is given.
+
+        >>> stats = SearchStats()
+        >>> sh = StonehengeGame(True, 2)
+        >>> _ = MCTSTree(seed=0).search(sh, 50, stats=stats)
+        >>> stats.nodes + stats.terminal_nodes
+        51
+        """
+        self._move_root(game.current_state)
+        if stats is not None:
+            stats.start()
+            stats.visit(0, len(self.root.untried) + len(self.root.children))
+        deadline = None
+        if budget_ms is not None:
+            deadline = time.perf_counter() + budget_ms / 1000
+        i = 0
+        while ((deadline is None and i < iterations) or
+               (deadline is not None and time.perf_counter() < deadline)):
+            node = self._select()
+            if node.untried:
+                node = self._expand(game, node)
+                if stats is not None:
+                    stats.visit(self._ply(node), len(node.untried))
+            wins = self._rollout(game, node, rollouts)
+            self._backpropagate(node, rollouts, wins)
+            i += 1
+
+        if stats is not None:
+            stats.stop()
+        if not self.root.children:
+            return game.current_state.get_possible_moves()[0]
+        return max(self.root.children, key=lambda child: child.visits).move
+
+    def _move_root(self, state: Union[StonehengeGameState,
+                                      SubtractSquareState]) -> None:
+        """Make the node of <state> the root of this tree. It is looked for
+        among the root and the two moves after it (our last move and the
+        opponent's reply), and a new tree is started if it isn't found.
+        """
+        if self.root is not None:
+            nodes = [self.root] + self.root.children
+            for child in self.root.children:
+                nodes.extend(child.children)
+            for node in nodes:
+                if node.state == state:
+                    self.root, node.parent = node, None
+                    return
+        self.root = MCTSNode(state, state.get_possible_moves())
+
+    def _ply(self, node: MCTSNode) -> int:
+        """Return the number of moves from the root of this tree to <node>.
+        """
+        ply = 0
+        while node is not self.root:
+            node, ply = node.parent, ply + 1
+        return ply
+
+    def _select(self) -> MCTSNode:
+        """Return the node to search from, found by following the children
+        with the best upper confidence bound down from the root until a
+        node with an untried move (or no moves at all) is reached.
+        """
+        node = self.root
+        while not node.untried and node.children:
+            log_visits = math.log(node.visits)
+            node = max(node.children, key=lambda child: (
+                child.wins / child.visits + self.exploration *
+                math.sqrt(log_visits / child.visits)))
+        return node
+
+    def _expand(self, game: Union[StonehengeGame, SubtractSquareGame],
+                node: MCTSNode) -> MCTSNode:
+        """Add a child to <node> for one of its untried moves, picked at
+        random, and return the child.
+        """
+        move = node.untried.pop(self.rng.randrange(len(node.untried)))
+        new_state = node.state.make_move(move)
+        moves = [] if game.is_over(new_state) else \
+            new_state.get_possible_moves()
+        child = MCTSNode(new_state, moves, move, node)
+        node.children.append(child)
+        return child
+
+    def _rollout(self, game: Union[StonehengeGame, SubtractSquareGame],
+                 node: MCTSNode, rollouts: int) -> int:
+        """Return how many of <rollouts> random games from the state of
+        <node> are won by the player who made node.move.
+
+        The games are played with apply and undo on the node's own state
+        when it supports them, so no new states are made.
+        """
+        if game.is_over(node.state):
+            return rollouts
+        wins = 0
+        for _ in range(rollouts):
+            state, num_moves = node.state, 0
+            try:
+                while not game.is_over(state):
+                    move = self.rng.choice(state.get_possible_moves())
+                    if _can_undo(state):
+                        state.apply(move)
+                    else:
+                        state = state.make_move(move)
+                    num_moves += 1
+            finally:
+                if _can_undo(state):
+                    for _ in range(num_moves):
+                        state.undo()
+            # The player who moved last won, and every other move is made
+            # by the player who made node.move.
+            if num_moves % 2 == 0:
+                wins += 1
+        return wins
+
+    def _backpropagate(self, node: MCTSNode, visits: int, wins: int) -> None:
+        """Add <visits> games, <wins> of which were won by the player who
+        made node.move, to <node> and every node above it.
+        """
+        while node is not None:
+            node.visits += visits
+            node.wins += wins
+            # The games won by one player were lost by the other.
+            wins = visits - wins
+            node = node.parent
+
+
+# The tree mcts_strategy keeps for each game.
+_MCTS_TREES = weakref.WeakKeyDictionary()
 
 
 def _for_pyta(state: StonehengeGameState) -> None:
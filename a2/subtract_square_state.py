@@ -3,22 +3,41 @@ An implementation of a state for SubtractSquare.
 
 NOTE: You do not have to run python-ta on this file.
 """
-from typing import Any
+from typing import Any, List, Optional
 from game_state import GameState
 
+# The Zobrist key for p1 being the current player.
+TURN_KEY = 0x9E3779B97F4A7C15
+
 
 class SubtractSquareState(GameState):
     """
     The state of a game at a certain point in time.
-    """
 
-    def __init__(self, is_p1_turn: bool, current_total: int) -> None:
+    zobrist - the 64-bit Zobrist key of this state, used as its hash
+    """
+    current_total: int
+    zobrist: int
+    # === Private Attributes ===
+    # _undo_stack:
+    #     The moves made with apply that haven't been undone yet, most
+    #     recent last, or None if apply hasn't been called.
+    _undo_stack: Optional[List[int]]
+
+    def __init__(self, is_p1_turn: bool, current_total: int,
+                 zobrist: int = None) -> None:
         """
         Initialize this game state and set the current player based on
         is_p1_turn.
         """
         super().__init__(is_p1_turn)
         self.current_total = current_total
+        self._undo_stack = None
+        if zobrist is None:
+            zobrist = total_key(current_total)
+            if is_p1_turn:
+                zobrist ^= TURN_KEY
+        self.zobrist = zobrist
 
     def __str__(self) -> str:
         """
@@ -44,10 +63,49 @@ class SubtractSquareState(GameState):
         if type(move) == str:
             move = int(move)
 
-        new_state = SubtractSquareState(not self.p1_turn,
-                                        self.current_total - move)
+        new_total = self.current_total - move
+        new_zobrist = (self.zobrist ^ TURN_KEY ^
+                       total_key(self.current_total) ^ total_key(new_total))
+        new_state = SubtractSquareState(not self.p1_turn, new_total,
+                                        new_zobrist)
         return new_state
 
+    def apply(self, move: Any) -> None:
+        """
+        Apply move to this state in place. Use undo to take it back.
+
+        >>> state = SubtractSquareState(True, 10)
+        >>> state.apply(9)
+        >>> state == SubtractSquareState(False, 1)
+        True
+        >>> state.undo()
+        >>> state == SubtractSquareState(True, 10)
+        True
+        """
+        if type(move) == str:
+            move = int(move)
+        if self._undo_stack is None:
+            self._undo_stack = []
+        self._undo_stack.append(move)
+        self.zobrist ^= (TURN_KEY ^ total_key(self.current_total) ^
+                         total_key(self.current_total - move))
+        self.current_total -= move
+        self.p1_turn = not self.p1_turn
+
+    def undo(self) -> None:
+        """
+        Take back the last move made with apply.
+
+        Raise an IndexError if there is no move to take back.
+        """
+        if not self._undo_stack:
+            raise IndexError('no move to undo')
+        move = self._undo_stack.pop()
+        self.zobrist ^= (TURN_KEY ^ total_key(self.current_total) ^
+                         total_key(self.current_total + move))
+        self.current_total += move
+        self.p1_turn = not self.p1_turn
+
     def __repr__(self) -> str:
         """
         Return a representation of this state (which can be used for
@@ -56,6 +114,32 @@ class SubtractSquareState(GameState):
         return "P1's Turn: {} - Total: {}".format(self.p1_turn,
                                                   self.current_total)
 
+    def __eq__(self, other: Any) -> bool:
+        """
+        Return whether this state has the same total and current player as
+        other.
+
+        >>> SubtractSquareState(True, 10).make_move(1) == \
+SubtractSquareState(False, 9)
+        True
+        >>> SubtractSquareState(True, 9) == SubtractSquareState(False, 9)
+        False
+        """
+        return (type(self) is type(other) and
+                self.zobrist == other.zobrist and
+                self.p1_turn == other.p1_turn and
+                self.current_total == other.current_total)
+
+    def __hash__(self) -> int:
+        """
+        Return the Zobrist key of this state.
+
+        >>> state = SubtractSquareState(True, 20).make_move(4).make_move(9)
+        >>> hash(state) == hash(SubtractSquareState(True, 7))
+        True
+        """
+        return self.zobrist
+
     def rough_outcome(self) -> float:
         """
         Return an estimate in interval [LOSE, WIN] of best outcome the current
@@ -71,6 +155,24 @@ class SubtractSquareState(GameState):
         return self.DRAW
 
 
+def total_key(n: int) -> int:
+    """
+    Return the 64-bit Zobrist key for a current total of n.
+
+    The keys are generated with the splitmix64 mixing function, so there is
+    no table to fill in and any total has a key.
+
+    >>> total_key(5) == total_key(5)
+    True
+    >>> total_key(5) == total_key(6)
+    False
+    """
+    z = (n * 0x9E3779B97F4A7C15) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & 0xFFFFFFFFFFFFFFFF
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & 0xFFFFFFFFFFFFFFFF
+    return z ^ (z >> 31)
+
+
 def is_pos_square(n: int) -> bool:
     """
     Return whether n is a positive perfect square
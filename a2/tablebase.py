@@ -0,0 +1,263 @@
+""" Stonehenge endgame tablebase
+
+=== CSC148 Winter 2018 ===
+University of Toronto
+Assignment 2
+Submitted by: Eric Koehli
+
+=== Module Description ===
+This module solves every position of a small Stonehenge board ahead of
+time, so a strategy can look moves up instead of searching for them.
+
+A tablebase is generated by retrograde analysis:
+    1. every position that can be reached from an empty board is found,
+       layer by layer, where layer k holds the positions with k captured
+       cells,
+    2. the layers are solved from the last one back to the first. Every
+       move adds one captured cell, so all the children of a position in
+       layer k are in layer k + 1, which has already been solved.
+
+The result of every position is stored in one byte of a dense bytearray,
+at the position's perfect hash (see Tablebase.index). A byte of 0 means
+the position wasn't reached, and otherwise the byte is
+1 + 2 * distance + (1 if the player to move wins else 0), where distance
+is the number of moves left until the game ends when the winner wins as
+quickly as possible and the loser holds out as long as possible.
+"""
+from typing import Dict, List, Optional, Tuple, Union
+from stonehenge import StonehengeGame, StonehengeGameState
+from stonehenge_layout import get_cells, get_ley_line_index
+from subtract_square_game import SubtractSquareGame
+from strategy import timed_strategy
+from search_stats import SearchStats
+
+# The board sizes tablebase_strategy generates a tablebase for.
+TABLEBASE_SIZES = (1, 2)
+
+
+class Tablebase:
+    """
+    The solved results of every reachable position of one Stonehenge board
+    size.
+
+    === Public Attributes ===
+    board_length:
+         The side length of the board.
+    values:
+         The result of every position, by its index.
+    """
+    board_length: int
+    values: bytearray
+    # === Private Attributes ===
+    # _cells:
+    #     The cells of the board, in order of their ids.
+    # _even_lines:
+    #     The names of the ley-lines with an even number of cells. Only
+    #     these can be claimed by either player once every cell is taken,
+    #     so they are the only markers that aren't decided by the cells.
+    _cells: List[str]
+    _even_lines: List[str]
+
+    def __init__(self, board_length: int, values: bytearray = None) -> None:
+        """Initialize a tablebase for the board with side length
+        <board_length> that holds <values>, or no results if <values> is
+        None.
+
+        >>> Tablebase(1).size()
+        432
+        """
+        self.board_length = board_length
+        self._cells = get_cells(board_length)
+        index = get_ley_line_index(board_length)
+        self._even_lines = [name for name in index.names
+                            if index.lengths[name] % 2 == 0]
+        if values is None:
+            values = bytearray(self.size())
+        self.values = values
+
+    def size(self) -> int:
+        """Return the number of indexes a position of this board can have.
+        """
+        return 3 ** len(self._cells) * 2 * 2 ** len(self._even_lines)
+
+    def index(self, state: StonehengeGameState) -> int:
+        """Return the index of <state> in values.
+
+        The index is a mixed-radix number with one base-3 digit for every
+        cell (free, or captured by player 1 or 2), one bit for the player
+        to move and one bit for every even ley-line (whether player 2
+        claimed it). No two positions have the same index.
+
+        >>> tablebase = Tablebase(1)
+        >>> tablebase.index(StonehengeGameState(True, 1))
+        8
+        >>> tablebase.index(StonehengeGameState(False, 1).make_move('A'))
+        299
+        """
+        index = get_ley_line_index(self.board_length)
+        number = 0
+        for cell in self._cells:
+            ley_line, position = index.cell_lines[cell][0]
+            value = state.ley_lines[ley_line][position]
+            number = number * 3 + (int(value) if value in ('1', '2') else 0)
+        number = number * 2 + int(state.p1_turn)
+        for ley_line in self._even_lines:
+            number = number * 2 + int(state.ley_lines[ley_line][0] == 'p2')
+        return number
+
+    def probe(self, state: StonehengeGameState) -> Optional[Tuple[int, int]]:
+        """Return the score of <state> for its current player and the
+        number of moves left until the game ends, or None if <state> isn't
+        in this tablebase.
+
+        >>> tablebase = generate_tablebase(1)
+        >>> tablebase.probe(StonehengeGameState(True, 1))
+        (1, 1)
+        >>> tablebase.probe(StonehengeGameState(True, 1).make_move('B'))
+        (-1, 0)
+        >>> Tablebase(1).probe(StonehengeGameState(True, 1)) is None
+        True
+        """
+        if state.board_length != self.board_length:
+            return None
+        value = self.values[self.index(state)]
+        if value == 0:
+            return None
+        return (state.WIN if (value - 1) % 2 else state.LOSE,
+                (value - 1) // 2)
+
+    def best_move(self, state: StonehengeGameState) -> Optional[str]:
+        """Return the best move from <state>, or None if <state> isn't in
+        this tablebase or the game is over.
+
+        The winner picks the quickest win and the loser the slowest loss.
+
+        >>> tablebase = generate_tablebase(2)
+        >>> state = StonehengeGameState(True, 2).make_move('D')
+        >>> state = state.make_move('F').make_move('A')
+        >>> tablebase.best_move(state)
+        'E'
+        """
+        if self.probe(state) is None:
+            return None
+        best_move, best_key = None, None
+        for move in state.get_possible_moves():
+            score, distance = self.probe(state.make_move(move))
+            # The child's score is for the opponent.
+            key = (-score, distance if score == state.WIN else -distance)
+            if best_key is None or key > best_key:
+                best_move, best_key = move, key
+        return best_move
+
+
+def generate_tablebase(board_length: int) -> Tablebase:
+    """Return the tablebase of every position that can be reached on the
+    board with side length <board_length>, whichever player starts.
+
+    >>> tablebase = generate_tablebase(1)
+    >>> sum(1 for value in tablebase.values if value)
+    8
+    """
+    tablebase = Tablebase(board_length)
+    game = StonehengeGame(True, board_length)
+
+    # Find every reachable position, one layer per captured cell.
+    layers = [{}]  # type: List[Dict[int, StonehengeGameState]]
+    for p1_starts in [True, False]:
+        state = StonehengeGameState(p1_starts, board_length)
+        layers[0][tablebase.index(state)] = state
+    while layers[-1]:
+        next_layer = {}
+        for state in layers[-1].values():
+            if game.is_over(state):
+                continue
+            for move in state.get_possible_moves():
+                new_state = state.make_move(move)
+                next_layer[tablebase.index(new_state)] = new_state
+        layers.append(next_layer)
+
+    # Solve the layers from the last one back to the first.
+    values = tablebase.values
+    for layer in reversed(layers):
+        for i, state in layer.items():
+            if game.is_over(state):
+                # The player who just moved won.
+                values[i] = 1
+                continue
+            wins, losses = [], []
+            for move in state.get_possible_moves():
+                state.apply(move)
+                try:
+                    value = values[tablebase.index(state)]
+                finally:
+                    state.undo()
+                # A child the opponent loses is a win for the player to
+                # move, one move further from the end.
+                if value % 2:
+                    wins.append((value - 1) // 2 + 1)
+                else:
+                    losses.append((value - 1) // 2 + 1)
+            if wins:
+                values[i] = 2 * min(wins) + 2
+            else:
+                values[i] = 2 * max(losses) + 1
+    return tablebase
+
+
+# The tablebases generated by tablebase_strategy, by board size.
+_TABLEBASES = {}  # type: Dict[int, Tablebase]
+
+
+def tablebase_strategy(game: Union[StonehengeGame, SubtractSquareGame],
+                       tablebase: Tablebase = None,
+                       fallback=timed_strategy,
+                       stats: SearchStats = None) -> Union[str, int]:
+    """
+    Return a move for <game> from a tablebase, or from <fallback> if the
+    current state isn't in it.
+
+    If <tablebase> isn't given, a tablebase is generated (once) for boards
+    with a size in TABLEBASE_SIZES. Other boards, and SubtractSquare
+    games, always use <fallback>.
+
+    If <stats> is given, the tablebase probe is counted in it as a cache
+    lookup, and it is passed on to <fallback>.
+
+    >>> sh = StonehengeGame(True, 2)
+    >>> sh.current_state = sh.current_state.make_move('A').make_move('F')
+    >>> sh.current_state = sh.current_state.make_move('D')
+    >>> stats = SearchStats()
+    >>> tablebase_strategy(sh, stats=stats)
+    'E'
+    >>> stats.cache_hits, stats.evaluated_nodes
+    (1, 1)
+    """
+    state = game.current_state
+    move = None
+    if stats is not None:
+        stats.start()
+    if isinstance(state, StonehengeGameState):
+        if tablebase is None and state.board_length in TABLEBASE_SIZES:
+            if state.board_length not in _TABLEBASES:
+                _TABLEBASES[state.board_length] = generate_tablebase(
+                    state.board_length)
+            tablebase = _TABLEBASES[state.board_length]
+        if tablebase is not None:
+            move = tablebase.best_move(state)
+            if stats is not None:
+                stats.lookup(move is not None)
+                if move is not None:
+                    stats.visit(0)
+    if move is None:
+        move = fallback(game) if stats is None else fallback(game,
+                                                             stats=stats)
+    if stats is not None:
+        stats.stop()
+    return move
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
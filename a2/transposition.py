@@ -0,0 +1,176 @@
+""" Transposition Table
+
+=== CSC148 Winter 2018 ===
+University of Toronto,
+Computer Science
+Assignment 2
+__author__ = 'Eric Koehli'
+
+=== Module Description ===
+This module contains a bounded transposition table for the minimax
+strategies. A transposition is a game state that can be reached by more
+than one order of moves; storing the score of every state we have already
+solved means each one is only searched once.
+"""
+from typing import Any, Hashable, Optional
+from collections import OrderedDict
+
+# The replacement policies a TranspositionTable can use once it is full.
+LRU = 'lru'
+FIFO = 'fifo'
+KEEP = 'keep'
+
+
+class TranspositionTable:
+    """A bounded table mapping game state keys to solved scores.
+
+    When the table is full, the replacement policy decides what happens to
+    a new entry:
+        - LRU: evict the entry that was used least recently.
+        - FIFO: evict the entry that was stored first.
+        - KEEP: keep the existing entries and drop the new one.
+
+    === Public Attributes ===
+    max_size:
+         The maximum number of entries the table holds.
+    policy:
+         The replacement policy, one of LRU, FIFO or KEEP.
+    hits:
+         The number of lookups that found an entry.
+    misses:
+         The number of lookups that didn't find an entry.
+    """
+    max_size: int
+    policy: str
+    hits: int
+    misses: int
+    # === Private Attributes ===
+    # _entries:
+    #     The stored entries, in the order they will be evicted.
+    _entries: OrderedDict
+
+    def __init__(self, max_size: int = 1000000, policy: str = LRU) -> None:
+        """Initialize a new empty TranspositionTable.
+
+        Raise a ValueError if <max_size> isn't positive or <policy> isn't
+        one of LRU, FIFO or KEEP.
+        """
+        if max_size <= 0:
+            raise ValueError('max_size must be positive')
+        if policy not in (LRU, FIFO, KEEP):
+            raise ValueError('unknown replacement policy: {}'.format(policy))
+        self.max_size, self.policy = max_size, policy
+        self.hits, self.misses = 0, 0
+        self._entries = OrderedDict()
+
+    def __len__(self) -> int:
+        """Return the number of entries in this table.
+
+        >>> table = TranspositionTable()
+        >>> table.put('a', 1)
+        >>> len(table)
+        1
+        """
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        """Return whether <key> has an entry in this table. This doesn't
+        count as a lookup.
+
+        >>> table = TranspositionTable()
+        >>> table.put('a', 1)
+        >>> 'a' in table, 'b' in table
+        (True, False)
+        """
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Return the value stored for <key>, or None if there isn't one.
+
+        >>> table = TranspositionTable()
+        >>> table.put('a', 1)
+        >>> table.get('a'), table.get('b')
+        (1, None)
+        >>> table.hits, table.misses
+        (1, 1)
+        """
+        value = self._entries.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        if self.policy == LRU:
+            self._entries.move_to_end(key)
+        return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store <value> for <key>, replacing an entry if the table is full.
+
+        >>> table = TranspositionTable(2, LRU)
+        >>> table.put('a', 1)
+        >>> table.put('b', 2)
+        >>> table.get('a')
+        1
+        >>> table.put('c', 3)
+        >>> 'a' in table, 'b' in table, 'c' in table
+        (True, False, True)
+        >>> table = TranspositionTable(2, FIFO)
+        >>> table.put('a', 1)
+        >>> table.put('b', 2)
+        >>> table.get('a')
+        1
+        >>> table.put('c', 3)
+        >>> 'a' in table, 'b' in table, 'c' in table
+        (False, True, True)
+        >>> table = TranspositionTable(2, KEEP)
+        >>> table.put('a', 1)
+        >>> table.put('b', 2)
+        >>> table.put('c', 3)
+        >>> 'a' in table, 'b' in table, 'c' in table
+        (True, True, False)
+        """
+        if key in self._entries:
+            self._entries[key] = value
+            if self.policy == LRU:
+                self._entries.move_to_end(key)
+            return
+        if len(self._entries) >= self.max_size:
+            if self.policy == KEEP:
+                return
+            self._entries.popitem(last=False)
+        self._entries[key] = value
+
+    def clear(self) -> None:
+        """Remove every entry from this table and reset its counters.
+
+        >>> table = TranspositionTable()
+        >>> table.put('a', 1)
+        >>> table.clear()
+        >>> len(table), table.hits, table.misses
+        (0, 0, 0)
+        """
+        self._entries.clear()
+        self.hits, self.misses = 0, 0
+
+    def hit_rate(self) -> float:
+        """Return the fraction of lookups that found an entry.
+
+        >>> table = TranspositionTable()
+        >>> table.hit_rate()
+        0.0
+        >>> table.put('a', 1)
+        >>> _ = table.get('a'), table.get('a'), table.get('b')
+        >>> round(table.hit_rate(), 2)
+        0.67
+        """
+        lookups = self.hits + self.misses
+        if lookups == 0:
+            return 0.0
+        return self.hits / lookups
+
+
+if __name__ == '__main__':
+    import doctest
+    doctest.testmod()
+    from python_ta import check_all
+    check_all(config="a2_pyta.txt")
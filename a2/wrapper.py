@@ -274,6 +274,145 @@ Wrapper(5.75)])
         return max(len(self.children), max(s.arity() for s in self.children))
 
 
+class SearchNode:
+    """
+    A compact node for an iterative game tree search.
+
+    Unlike a Wrapper, a SearchNode doesn't own a list of children. All the
+    nodes of a search live in one flat list, and the children of a node
+    are the slice nodes[first_child:end_child] of that list. Its __slots__
+    mean a SearchNode has no instance dictionary either.
+
+    === Public attributes ===
+    state:
+         The game state of this node, or None once the node has been
+         expanded (its children hold the states that come after it).
+    move:
+         The move that was applied to get to this game state.
+    score:
+         The score of this node for its current player (1 or -1), or None
+         if it hasn't been scored yet.
+    first_child, end_child:
+         The range of indices of this node's children in the flat list of
+         nodes, or None if the node hasn't been expanded yet.
+    """
+    __slots__ = ('state', 'move', 'score', 'first_child', 'end_child')
+    state: object
+    move: Optional[str]
+    score: Optional[int]
+    first_child: Optional[int]
+    end_child: Optional[int]
+
+    def __init__(self, state: object, move: str = None) -> None:
+        """
+        Create an unexpanded, unscored SearchNode for <state>.
+
+        >>> node = SearchNode(5, 'A')
+        >>> node.state, node.move, node.score, node.first_child
+        (5, 'A', None, None)
+        >>> node.children = []
+        Traceback (most recent call last):
+        ...
+        AttributeError: 'SearchNode' object has no attribute 'children'
+        """
+        self.state, self.move, self.score = state, move, None
+        self.first_child, self.end_child = None, None
+
+
+class MCTSNode:
+    """
+    A node of a Monte Carlo search tree.
+
+    === Public attributes ===
+    state:
+         The game state of this node.
+    move:
+         The move that was applied to get to this game state.
+    parent:
+         The node this node's state came from, or None for the root.
+    children:
+         The nodes for the moves from this state that have been tried.
+    untried:
+         The moves from this state that don't have a node yet.
+    visits:
+         The number of random games played through this node.
+    wins:
+         The number of those games won by the player who made <move>.
+    """
+    __slots__ = ('state', 'move', 'parent', 'children', 'untried', 'visits',
+                 'wins')
+    state: object
+    move: Optional[str]
+    parent: Optional['MCTSNode']
+    children: List['MCTSNode']
+    untried: List[Any]
+    visits: int
+    wins: float
+
+    def __init__(self, state: object, moves: List[Any], move: str = None,
+                 parent: 'MCTSNode' = None) -> None:
+        """
+        Create an unvisited MCTSNode for <state>, where <moves> are the
+        moves that can be made from <state>.
+
+        >>> node = MCTSNode(5, [1, 4])
+        >>> node.untried, node.children, node.visits, node.wins
+        ([1, 4], [], 0, 0)
+        """
+        self.state, self.move, self.parent = state, move, parent
+        self.children, self.untried = [], moves
+        self.visits, self.wins = 0, 0
+
+
+class ProofNode:
+    """
+    A node of a proof-number search tree.
+
+    The root player is the current player of the root's state. At an OR
+    node the root player moves, so one winning child is enough. At an AND
+    node the opponent moves, so every child has to be won.
+
+    === Public attributes ===
+    state:
+         The game state of this node.
+    move:
+         The move that was applied to get to this game state.
+    parent:
+         The node this node's state came from, or None for the root.
+    children:
+         The nodes for the moves from this state, or an empty list if the
+         node hasn't been expanded (or has been solved).
+    is_or:
+         Whether the root player moves at this node.
+    proof, disproof:
+         The least number of nodes that still have to be solved to prove
+         that the root player wins (or loses) from this node.
+    """
+    __slots__ = ('state', 'move', 'parent', 'children', 'is_or', 'proof',
+                 'disproof')
+    state: object
+    move: Optional[str]
+    parent: Optional['ProofNode']
+    children: List['ProofNode']
+    is_or: bool
+    proof: float
+    disproof: float
+
+    def __init__(self, state: object, is_or: bool, move: str = None,
+                 parent: 'ProofNode' = None) -> None:
+        """
+        Create an unexpanded ProofNode for <state>, which nothing is known
+        about yet.
+
+        >>> node = ProofNode(5, True)
+        >>> node.proof, node.disproof, node.children
+        (1, 1, [])
+        """
+        self.state, self.move, self.parent = state, move, parent
+        self.children, self.is_or = [], is_or
+        self.proof, self.disproof = 1, 1
+
+
 if __name__ == '__main__':
     import doctest
     doctest.testmod()